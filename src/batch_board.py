@@ -0,0 +1,311 @@
+"""
+batch_board.py
+    - Vectorized checkers engine which plays many games at once using NumPy.
+
+The positions of all games are stacked into a single (games, squares) int8 array using the packed layout of
+CheckerBoard.get_squares. Move generation, move application and end game detection are done for every game at once
+with array operations, following exactly the same rules as board.CheckerBoard. Moves are generated in the same order as
+CheckerBoard.legal_moves.
+
+NumPy is required by this module.
+"""
+import time
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+
+_PADDING = 127  # Value of the extra square which off board neighbours point at. It is never empty.
+
+
+class _BatchGeometry:
+    """Per board size lookup arrays shared by all BatchCheckerBoard instances."""
+    def __init__(self, board_size):
+        half = board_size // 2
+        self.num_squares = board_size * half
+        self.half = half
+        self.rows = np.arange(self.num_squares) // half
+        self.cols = 2 * (np.arange(self.num_squares) % half) + (self.rows + 1) % 2
+        # Neighbour and landing square per direction, in CheckerBoard step order: (1, -1), (1, 1), (-1, -1), (-1, 1).
+        # Off board squares point at the padding square.
+        self.neighbours = np.full((self.num_squares, 4), self.num_squares, dtype=np.intp)
+        self.landings = np.full((self.num_squares, 4), self.num_squares, dtype=np.intp)
+        for direction, (row_step, col_step) in enumerate(((1, -1), (1, 1), (-1, -1), (-1, 1))):
+            for distance, table in ((1, self.neighbours), (2, self.landings)):
+                x, y = self.rows + distance * row_step, self.cols + distance * col_step
+                on_board = (x >= 0) & (x < board_size) & (y >= 0) & (y < board_size)
+                table[on_board, direction] = x[on_board] * half + y[on_board] // 2
+        # Directions each piece code may move in, indexed by piece code + 2
+        self.allowed = np.array([[True, True, True, True],  # Black king
+                                 [False, False, True, True],  # Black pawn
+                                 [False, False, False, False],  # Empty
+                                 [True, True, False, False],  # White pawn
+                                 [True, True, True, True]])  # White king
+        self.locations = [(int(row), int(col)) for row, col in zip(self.rows, self.cols)]
+        self.last_row = board_size - 1
+        start_rows = half - 1
+        self.start = np.zeros(self.num_squares, dtype=np.int8)
+        self.start[:start_rows * half] = 1
+        self.start[self.num_squares - start_rows * half:] = -1
+
+
+_GEOMETRIES = {}
+
+
+def _get_geometry(board_size):
+    geometry = _GEOMETRIES.get(board_size)
+    if geometry is None:
+        geometry = _GEOMETRIES[board_size] = _BatchGeometry(board_size)
+    return geometry
+
+
+class BatchCheckerBoard:
+    """Holds many checkers games of the same board size and advances them all at once."""
+    def __init__(self, board_size, num_games):
+        """Inits a BatchCheckerBoard with every game in the starting position.
+
+        :param board_size: Size of the square board to be used. Must be even and >= 4.
+        :param num_games: Number of games to hold
+        :raises ValueError: if board_size is not an even number or less than 4
+        :raises ImportError: if NumPy is not installed
+        """
+        if np is None:
+            raise ImportError('BatchCheckerBoard requires numpy')
+        if not board_size % 2 == 0:
+            raise ValueError('Board size must be divisible by 2')
+        if board_size < 4:
+            raise ValueError("Board size must be at least 4")
+
+        self._board_size = board_size
+        self._geometry = _get_geometry(board_size)
+        self._num_games = num_games
+        # One row per game, with an extra padding square at the end which off board neighbours point at
+        self._squares = np.empty((num_games, self._geometry.num_squares + 1), dtype=np.int8)
+        self._squares[:, :-1] = self._geometry.start
+        self._squares[:, -1] = _PADDING
+        self._current_players = np.ones(num_games, dtype=np.int8)  # 1 if white is to move, -1 if black is to move
+        # The number of moves since a capture or promotion to king, per game
+        self._end_game_move_counts = np.zeros(num_games, dtype=np.int32)
+
+    @classmethod
+    def from_boards(cls, boards):
+        """Creates a BatchCheckerBoard holding a copy of the position of each board.
+
+        :param boards: List of CheckerBoard instances, all of the same size
+        :returns BatchCheckerBoard: Batch with one game per board
+        """
+        batch = cls(boards[0]._board_size, len(boards))
+        data = b''.join([board.get_squares() for board in boards])
+        batch._squares[:, :-1] = np.frombuffer(data, dtype=np.int8).reshape(len(boards), -1)
+        batch._current_players[:] = [1 if board.current_player == 'w' else -1 for board in boards]
+        batch._end_game_move_counts[:] = [board._end_game_move_count for board in boards]
+        return batch
+
+    def __len__(self):
+        return self._num_games
+
+    def get_squares(self):
+        """Gets the packed positions of all games.
+
+        :returns numpy.ndarray: (games, squares) int8 array, in the layout of CheckerBoard.get_squares
+        """
+        return self._squares[:, :-1].copy()
+
+    def get_current_players(self):
+        """Gets the player to move in each game.
+
+        :returns list: 'w' or 'b' for each game
+        """
+        return ['w' if player > 0 else 'b' for player in self._current_players]
+
+    def _step_masks(self):
+        """Finds the single steps and single jumps available in every game.
+
+        :returns tuple: Two (games, squares, 4) boolean arrays, marking the pieces of the player to move which can step
+        or jump in each direction
+        """
+        geometry = self._geometry
+        board = self._squares[:, :-1]
+        players = self._current_players
+        own = (board * players[:, None]) > 0
+        movable = own[:, :, None] & geometry.allowed[board + 2]
+        neighbours = self._squares[:, geometry.neighbours]
+        landings = self._squares[:, geometry.landings]
+        steps = movable & (neighbours == 0)
+        jumps = movable & ((neighbours * players[:, None, None]) < 0) & (landings == 0)
+        return steps, jumps
+
+    def _generate(self):
+        """Generates the legal moves of every game, applying the forced capture rule.
+
+        :returns tuple: Array with the game index of each move, and a list with each move as a list of square indexes.
+        Moves are grouped by game, in CheckerBoard.legal_moves order.
+        """
+        geometry = self._geometry
+        steps, jumps = self._step_masks()
+        has_jump = jumps.any(axis=(1, 2))
+
+        # Games without jumps: every single step, in square then direction order
+        step_games, step_squares, step_directions = np.nonzero(steps & ~has_jump[:, None, None])
+        step_targets = geometry.neighbours[step_squares, step_directions]
+        keys = [(game, (square, direction)) for game, square, direction
+                in zip(step_games.tolist(), step_squares.tolist(), step_directions.tolist())]
+        paths = [[square, target] for square, target in zip(step_squares.tolist(), step_targets.tolist())]
+
+        # Games with jumps: extend all jump sequences one jump at a time. Every prefix of a sequence is a legal move.
+        games, squares, directions = np.nonzero(jumps)
+        boards = self._squares[games]
+        pieces = boards[np.arange(len(games)), squares]
+        chain_keys = [(square, direction) for square, direction in zip(squares.tolist(), directions.tolist())]
+        chain_paths = [[square] for square in squares.tolist()]
+        while len(games):
+            index = np.arange(len(games))
+            jumped = geometry.neighbours[squares, directions]
+            landings = geometry.landings[squares, directions]
+            boards[index, squares] = 0
+            boards[index, jumped] = 0
+            # A pawn is promoted when it reaches the last row, and continues jumping as a king
+            promoted = (((pieces == 1) & (geometry.rows[landings] == geometry.last_row)) |
+                        ((pieces == -1) & (geometry.rows[landings] == 0)))
+            pieces = np.where(promoted, pieces * 2, pieces).astype(np.int8)
+            boards[index, landings] = pieces
+            chain_paths = [path + [landing] for path, landing in zip(chain_paths, landings.tolist())]
+            keys.extend(zip(games.tolist(), chain_keys))
+            paths.extend(chain_paths)
+
+            # Find further jumps from the landing squares
+            neighbours = boards[index[:, None], geometry.neighbours[landings]]
+            beyond = boards[index[:, None], geometry.landings[landings]]
+            further = (geometry.allowed[pieces + 2] & ((neighbours * np.sign(pieces)[:, None]) < 0) & (beyond == 0))
+            parents, directions = np.nonzero(further)
+            games = games[parents]
+            squares = landings[parents]
+            boards = boards[parents]
+            pieces = pieces[parents]
+            chain_keys = [chain_keys[parent] + (direction,)
+                          for parent, direction in zip(parents.tolist(), directions.tolist())]
+            chain_paths = [chain_paths[parent] for parent in parents.tolist()]
+
+        # Jump sequences are found breadth first, sort them into CheckerBoard's depth first order
+        order = sorted(range(len(keys)), key=keys.__getitem__)
+        return np.array([keys[i][0] for i in order], dtype=np.intp), [paths[i] for i in order]
+
+    def legal_moves(self):
+        """Gets the valid moves for the player to move in every game.
+
+        :returns list: For each game, the list of moves CheckerBoard.legal_moves would return for its position
+        """
+        locations = self._geometry.locations
+        moves = [[] for _ in range(self._num_games)]
+        games, paths = self._generate()
+        for game, path in zip(games.tolist(), paths):
+            moves[game].append([locations[square] for square in path])
+        return moves
+
+    def make_moves(self, moves):
+        """Executes one move in each game, without validating them.
+
+        :param moves: List with, for each game, a move as a list of location tuples, or None to leave the game as it is
+        """
+        half = self._geometry.half
+        games = [game for game, move in enumerate(moves) if move]
+        paths = [[loc[0] * half + loc[1] // 2 for loc in moves[game]] for game in games]
+        self._make_paths(np.array(games, dtype=np.intp), paths)
+
+    def _make_paths(self, games, paths):
+        """Executes one move, given as a list of square indexes, in each of the given games."""
+        if len(games) == 0:
+            return
+        geometry = self._geometry
+        lengths = np.array([len(path) for path in paths])
+        padded = np.zeros((len(paths), lengths.max()), dtype=np.intp)
+        for i, path in enumerate(paths):
+            padded[i, :len(path)] = path
+        captured_or_promoted = np.zeros(len(games), dtype=bool)
+        for hop in range(lengths.max() - 1):
+            selected = np.nonzero(lengths > hop + 1)[0]
+            hop_games = games[selected]
+            start = padded[selected, hop]
+            end = padded[selected, hop + 1]
+            pieces = self._squares[hop_games, start]
+            self._squares[hop_games, start] = 0
+            # A pawn is promoted when it reaches the last row
+            promoted = (((pieces == 1) & (geometry.rows[end] == geometry.last_row)) |
+                        ((pieces == -1) & (geometry.rows[end] == 0)))
+            self._squares[hop_games, end] = np.where(promoted, pieces * 2, pieces)
+            # A piece is removed if jumped over
+            jump = np.abs(geometry.rows[end] - geometry.rows[start]) == 2
+            jumped = (((geometry.rows[start] + geometry.rows[end]) // 2) * geometry.half +
+                      ((geometry.cols[start] + geometry.cols[end]) // 2) // 2)
+            self._squares[hop_games[jump], jumped[jump]] = 0
+            captured_or_promoted[selected] |= promoted | jump
+        self._current_players[games] *= -1
+        self._end_game_move_counts[games] = np.where(captured_or_promoted, 0, self._end_game_move_counts[games] + 1)
+
+    def expand(self):
+        """Creates a batch holding every position reachable with one move from every game.
+
+        :returns tuple: Array with the index of the parent game of each child, and a BatchCheckerBoard with the
+        children, grouped by parent and in legal_moves order
+        """
+        games, paths = self._generate()
+        children = BatchCheckerBoard.__new__(BatchCheckerBoard)
+        children._board_size = self._board_size
+        children._geometry = self._geometry
+        children._num_games = len(games)
+        children._squares = self._squares[games]
+        children._current_players = self._current_players[games]
+        children._end_game_move_counts = self._end_game_move_counts[games]
+        children._make_paths(np.arange(len(games)), paths)
+        return games, children
+
+    def _winner_codes(self):
+        """Checks for end game status in every game.
+
+        :returns numpy.ndarray: For each game, 1 if white wins, -1 if black wins, 2 for a draw and 0 otherwise
+        """
+        steps, jumps = self._step_masks()
+        has_move = steps.any(axis=(1, 2)) | jumps.any(axis=(1, 2))
+        board = self._squares[:, :-1]
+        players = self._current_players.astype(np.int32)
+        pieces = ((board * self._current_players[:, None]) > 0).sum(axis=1)
+        opponent_pieces = ((board * self._current_players[:, None]) < 0).sum(axis=1)
+        piece_winner = np.where(pieces > opponent_pieces, players,
+                                np.where(opponent_pieces > pieces, -players, 2))
+        winners = np.where(self._end_game_move_counts == 40, piece_winner, 0)
+        return np.where(has_move, winners, -players)
+
+    def get_winners(self):
+        """Checks for end game status in every game.
+
+        :returns list: For each game, 'w' if white wins, 'b' if black wins, 'd' if draw, None otherwise
+        """
+        return [{1: 'w', -1: 'b', 2: 'd', 0: None}[code] for code in self._winner_codes().tolist()]
+
+    def play_random(self, max_plies=None, rng=None, end_time=None, stop=None):
+        """Plays every game to the end (or for max_plies) choosing uniformly random valid moves.
+
+        :param max_plies: Maximum number of plies to play, unlimited if None
+        :param rng: numpy.random.Generator to choose moves with, a new one is created if None
+        :param end_time: Value of time.monotonic() after which no further plies are played, unlimited if None
+        :param stop: threading.Event or Deadline which stops the games after the current ply when set
+        :returns list: For each game, 'w' if white won, 'b' if black won, 'd' if drawn, None if not finished
+        """
+        if rng is None:
+            rng = np.random.default_rng()
+        plies = 0
+        winners = self._winner_codes()
+        while (max_plies is None or plies < max_plies) and not winners.all():
+            if (end_time is not None and time.monotonic() >= end_time) or (stop is not None and stop.is_set()):
+                break
+            games, paths = self._generate()
+            counts = np.bincount(games, minlength=self._num_games)
+            offsets = np.concatenate([[0], np.cumsum(counts)[:-1]])
+            playing = np.nonzero((winners == 0) & (counts > 0))[0]
+            chosen = offsets[playing] + (rng.random(len(playing)) * counts[playing]).astype(np.intp)
+            self._make_paths(playing, [paths[i] for i in chosen.tolist()])
+            winners = np.where(winners == 0, self._winner_codes(), winners)
+            plies += 1
+        return [{1: 'w', -1: 'b', 2: 'd', 0: None}[code] for code in winners.tolist()]
@@ -0,0 +1,410 @@
+"""
+bitboard.py
+    - Bitboard implementation of the CheckerBoard engine.
+
+The position is stored as four integers (white men, white kings, black men, black kings) instead of a 2D array of
+characters. Squares are numbered along the diagonals with one "ghost" square per row pair, so that every diagonal
+step is a constant shift for any even board size:
+
+    index(row, col) = (row * (board_size + 1) + col) // 2
+
+A step to (row + 1, col - 1) adds board_size / 2 to the index, and a step to (row + 1, col + 1) adds
+board_size / 2 + 1. Steps which would leave the board through a side land on a ghost square and are removed by
+masking with the valid squares. Python integers are arbitrary precision, so the same code handles 8x8, 10x10 and
+larger boards.
+"""
+
+
+class _Geometry:
+    """Per board size lookup data shared by all BitboardCheckerBoard instances."""
+    def __init__(self, board_size):
+        self.board_size = board_size
+        half = board_size // 2
+        # Shift amounts in the same order CheckerBoard._generate_steps uses: (1, -1), (1, 1), (-1, -1), (-1, 1).
+        # Positive shifts move towards higher rows (white's forward direction).
+        self.shifts = (half, half + 1, -(half + 1), -half)
+        self.locations = {}  # bit index -> (row, col)
+        self.indexes = {}  # (row, col) -> bit index
+        self.valid = 0
+        self.white_promotion = 0  # Last row, reached by white
+        self.black_promotion = 0  # First row, reached by black
+        self.white_start = 0
+        self.black_start = 0
+        player_rows = board_size // 2 - 1
+        for row in range(board_size):
+            for col in range(board_size):
+                if (row + col) % 2 == 0:
+                    continue
+                index = (row * (board_size + 1) + col) // 2
+                bit = 1 << index
+                self.locations[index] = (row, col)
+                self.indexes[(row, col)] = index
+                self.valid |= bit
+                if row == board_size - 1:
+                    self.white_promotion |= bit
+                if row == 0:
+                    self.black_promotion |= bit
+                if row < player_rows:
+                    self.white_start |= bit
+                if row >= board_size - player_rows:
+                    self.black_start |= bit
+
+
+_GEOMETRIES = {}
+
+
+def _get_geometry(board_size):
+    geometry = _GEOMETRIES.get(board_size)
+    if geometry is None:
+        geometry = _GEOMETRIES[board_size] = _Geometry(board_size)
+    return geometry
+
+
+def _shift(bits, amount):
+    return bits << amount if amount > 0 else bits >> -amount
+
+
+def _iter_bits(bits):
+    """Yields the index of each set bit, lowest first (which is also row-major board order)."""
+    while bits:
+        low = bits & -bits
+        yield low.bit_length() - 1
+        bits ^= low
+
+
+class BitboardCheckerBoard:
+    """A CheckerBoard engine backed by integer bitboards.
+
+    Provides the same public API as board.CheckerBoard, so it can be used wherever a CheckerBoard is expected.
+    """
+    __slots__ = ('_board_size', '_geometry', 'current_player', '_end_game_move_count', '_legal_moves', '_white_men',
+                 '_white_kings', '_black_men', '_black_kings')
+
+    def __init__(self, board_size):
+        """Inits a BitboardCheckerBoard with the specified parameters.
+
+        :param board_size: Size of the square board to be used. Must be even and >= 4.
+        :raises ValueError: if board_size is not an even number or less than 4
+        """
+        if not board_size % 2 == 0:
+            raise ValueError('Board size must be divisible by 2')
+        if board_size < 4:
+            raise ValueError("Board size must be at least 4")
+
+        self._board_size = board_size
+        self._geometry = _get_geometry(board_size)
+        self.current_player = 'w'
+        self._end_game_move_count = 0  # The number of moves since a capture or promotion to king
+        self._legal_moves = None  # Cached result of legal_moves, cleared whenever the board changes
+
+        # One integer per piece type, bit i is set if the piece occupies square index i
+        self._white_men = self._geometry.white_start
+        self._white_kings = 0
+        self._black_men = self._geometry.black_start
+        self._black_kings = 0
+
+    @classmethod
+    def from_rows(cls, rows, current_player='w', end_game_move_count=0):
+        """Creates a board in the given position, see CheckerBoard.from_rows.
+
+        :param rows: Position as a 2D array of 'b', 'B', 'w', 'W', 0 or '_', in the format returned by indexing a board
+        :param current_player: Player to move, 'w' or 'b'
+        :param end_game_move_count: The number of moves since a capture or promotion to king
+        :returns BitboardCheckerBoard: Board in the given position
+        """
+        board = cls(len(rows))
+        board._white_men = board._white_kings = board._black_men = board._black_kings = 0
+        for loc, index in board._geometry.indexes.items():
+            piece = rows[loc[0]][loc[1]]
+            if piece == 'w':
+                board._white_men |= 1 << index
+            elif piece == 'W':
+                board._white_kings |= 1 << index
+            elif piece == 'b':
+                board._black_men |= 1 << index
+            elif piece == 'B':
+                board._black_kings |= 1 << index
+        board.current_player = current_player
+        board._end_game_move_count = end_game_move_count
+        return board
+
+    def clone(self):
+        """Creates an independent copy of this board.
+
+        :returns BitboardCheckerBoard: Copy of this board
+        """
+        board = BitboardCheckerBoard.__new__(BitboardCheckerBoard)
+        board._board_size = self._board_size
+        board._geometry = self._geometry
+        board.current_player = self.current_player
+        board._end_game_move_count = self._end_game_move_count
+        board._legal_moves = self._legal_moves  # Never modified in place, so it can be shared
+        board._white_men = self._white_men
+        board._white_kings = self._white_kings
+        board._black_men = self._black_men
+        board._black_kings = self._black_kings
+        return board
+
+    def __copy__(self):
+        return self.clone()
+
+    def __deepcopy__(self, memo):
+        return self.clone()
+
+    def get_squares(self):
+        """Gets the packed representation of the position, in the same layout as CheckerBoard.get_squares.
+
+        :returns bytes: Packed squares, one signed byte per playable square, row by row
+        """
+        codes = {'w': 1, 'W': 2, 'b': 256 - 1, 'B': 256 - 2}
+        half = self._board_size // 2
+        squares = bytearray(self._board_size * half)
+        for piece, (row, col) in self.get_pieces():
+            squares[row * half + col // 2] = codes[piece]
+        return bytes(squares)
+
+    def print(self):
+        """Prints a representation of the board to the console"""
+        board = '   ' + ''.join(['{:^3}'.format(i) for i in range(self._board_size)]) + '\n'
+        board += '\n'.join([''.join(['{:^3}'.format(item) for item in [row_ind] + self[row_ind]])
+                            for row_ind in range(self._board_size)])
+        print(board)
+
+    def execute_move(self, move):
+        """Executes specified move if valid.
+
+        If a move is successfully executed, current_player is rotated to the next player.
+
+        :param move: Move to execute
+        :returns bool: true if move is executed successfully, false otherwise
+        """
+        if list(move) not in self.legal_moves():
+            return False
+        self.make_move(move)
+        return True
+
+    def make_move(self, move):
+        """Executes move in place without validating it.
+
+        :param move: Move to execute, as a list of location tuples
+        :returns tuple: Undo token for unmake_move
+        """
+        token = (self._white_men, self._white_kings, self._black_men, self._black_kings,
+                 self._end_game_move_count, self.current_player, self._legal_moves)
+        indexes = self._geometry.indexes
+        white = self.current_player == 'w'
+        men, kings = (self._white_men, self._white_kings) if white else (self._black_men, self._black_kings)
+        opponent_men, opponent_kings = ((self._black_men, self._black_kings) if white
+                                        else (self._white_men, self._white_kings))
+        promotion = self._geometry.white_promotion if white else self._geometry.black_promotion
+        jump_or_king = False  # Indicates this move was a capture or a promotion to king
+        for start, end in zip(move, move[1:]):
+            from_bit = 1 << indexes[start]
+            to_bit = 1 << indexes[end]
+            if men & from_bit:
+                men ^= from_bit
+                if to_bit & promotion:
+                    kings |= to_bit
+                    jump_or_king = True
+                else:
+                    men |= to_bit
+            else:
+                kings ^= from_bit | to_bit
+            # A piece is removed if jumped over
+            if abs(end[0] - start[0]) == 2:
+                captured = ~(1 << indexes[((start[0] + end[0]) // 2, (start[1] + end[1]) // 2)])
+                opponent_men &= captured
+                opponent_kings &= captured
+                jump_or_king = True
+
+        if white:
+            self._white_men, self._white_kings, self._black_men, self._black_kings = (
+                men, kings, opponent_men, opponent_kings)
+        else:
+            self._black_men, self._black_kings, self._white_men, self._white_kings = (
+                men, kings, opponent_men, opponent_kings)
+        self.current_player = 'w' if self.current_player == 'b' else 'b'
+        if jump_or_king:
+            self._end_game_move_count = 0
+        else:
+            self._end_game_move_count += 1
+        self._legal_moves = None
+        return token
+
+    def unmake_move(self, token):
+        """Restores the board to its state before the move which returned token was made.
+
+        :param token: Undo token returned by make_move
+        """
+        (self._white_men, self._white_kings, self._black_men, self._black_kings,
+         self._end_game_move_count, self.current_player, self._legal_moves) = token
+
+    def legal_moves(self):
+        """Gets all valid moves for the current player, applying the forced capture rule.
+
+        Whether any piece can jump is decided for the whole side at once, so simple moves are only generated when
+        there are no jumps. The result is cached until the board changes.
+
+        :returns list: List of moves, each a list of location tuples
+        """
+        if self._legal_moves is None:
+            locations = self._geometry.locations
+            jumpers = self._jumpers(self.current_player)
+            moves = []
+            if jumpers:
+                for index in _iter_bits(jumpers):
+                    moves.extend(self._generate_jumps(index, locations[index]))
+            else:
+                pieces = (self._white_men | self._white_kings if self.current_player == 'w'
+                          else self._black_men | self._black_kings)
+                for index in _iter_bits(pieces):
+                    moves.extend(self._generate_steps(index, locations[index]))
+            self._legal_moves = moves
+        return list(self._legal_moves)
+
+    def _jumpers(self, w_or_b):
+        """Returns a bitboard of the pieces of the given color which have at least one jump available."""
+        geometry = self._geometry
+        empty = geometry.valid & ~(self._white_men | self._white_kings | self._black_men | self._black_kings)
+        if w_or_b == 'w':
+            men, kings, opponents = self._white_men, self._white_kings, self._black_men | self._black_kings
+        else:
+            men, kings, opponents = self._black_men, self._black_kings, self._white_men | self._white_kings
+        white = w_or_b == 'w'
+        jumpers = 0
+        for shift in geometry.shifts:
+            movers = kings | men if (shift > 0) == white else kings
+            landing = _shift(_shift(empty, -shift) & opponents, -shift)
+            jumpers |= movers & landing
+        return jumpers
+
+    def _generate_steps(self, index, loc):
+        """Generates the non-capturing moves of the piece at index, in _generate_steps order."""
+        geometry = self._geometry
+        bit = 1 << index
+        empty = geometry.valid & ~(self._white_men | self._white_kings | self._black_men | self._black_kings)
+        is_king = bit & (self._white_kings | self._black_kings)
+        white = bit & (self._white_men | self._white_kings)
+        moves = []
+        for shift in geometry.shifts:
+            if not is_king and (shift > 0) != bool(white):
+                continue
+            target = _shift(bit, shift)
+            if target & empty:
+                moves.append([loc, geometry.locations[index + shift]])
+        return moves
+
+    def _generate_jumps(self, index, loc):
+        """Generates all jumps, including partial and multiple jumps, for the piece at index."""
+        bit = 1 << index
+        white = bool(bit & (self._white_men | self._white_kings))
+        is_king = bool(bit & (self._white_kings | self._black_kings))
+        opponents = self._black_men | self._black_kings if white else self._white_men | self._white_kings
+        empty = self._geometry.valid & ~(self._white_men | self._white_kings | self._black_men | self._black_kings)
+        return self._jump_extensions(index, loc, white, is_king, opponents, empty)
+
+    def _jump_extensions(self, index, loc, white, is_king, opponents, empty):
+        geometry = self._geometry
+        locations = geometry.locations
+        promotion = geometry.white_promotion if white else geometry.black_promotion
+        jumps = []
+        for shift in geometry.shifts:
+            if not is_king and (shift > 0) != white:
+                continue
+            over = index + shift
+            land = over + shift
+            if land < 0 or not (opponents >> over) & 1 or not (empty >> land) & 1:
+                continue
+            land_loc = locations[land]
+            jumps.append([loc, land_loc])
+            # The square being left and the captured piece are emptied immediately, and a man reaching the last row
+            # continues jumping as a king
+            land_bit = 1 << land
+            jumps.extend([[loc] + extension for extension in self._jump_extensions(
+                land, land_loc, white, is_king or bool(land_bit & promotion), opponents & ~(1 << over),
+                (empty | 1 << index | 1 << over) & ~land_bit)])
+        return jumps
+
+    def get_winner(self):
+        """Checks for end game status and returns winner.
+
+        :returns str: 'w' if white wins, 'b' if black wins, 'd' if draw, None otherwise
+        """
+        opponent_player = 'w' if self.current_player == 'b' else 'b'
+        if len(self.legal_moves()) == 0:
+            return opponent_player
+        if self._end_game_move_count == 40:
+            count = len(self.get_locations_by_color(self.current_player))
+            opponent_count = len(self.get_locations_by_color(opponent_player))
+            if count > opponent_count:
+                return self.current_player
+            elif opponent_count > count:
+                return opponent_player
+            else:
+                return 'd'
+        return None
+
+    def generate_moves(self, loc):
+        """Generates list of valid moves for the piece at loc.
+
+        Moves are represented as a list of locations, eg, [(x1,y1),(x2,y2)], including the starting location.
+
+        :param loc: Location of piece to check
+        :return tuple: First element is boolean indicating whether the moves are jumps or not. Second element is a list
+        of location tuples which the piece at loc can move to.
+        """
+        index = self._geometry.indexes[loc]
+        jumps = self._generate_jumps(index, loc)
+        if jumps:
+            return True, jumps
+        return False, self._generate_steps(index, loc)
+
+    def __getitem__(self, item):
+        if not 0 <= item < self._board_size:
+            raise IndexError('row index out of range')
+        indexes = self._geometry.indexes
+        row = []
+        for col in range(self._board_size):
+            index = indexes.get((item, col))
+            if index is None:
+                row.append('_')
+            elif (self._white_men >> index) & 1:
+                row.append('w')
+            elif (self._white_kings >> index) & 1:
+                row.append('W')
+            elif (self._black_men >> index) & 1:
+                row.append('b')
+            elif (self._black_kings >> index) & 1:
+                row.append('B')
+            else:
+                row.append(0)
+        return row
+
+    def get_pieces(self):
+        """Gets a list of all player pieces on the board.
+
+        :returns list: List of tuples where first element is the piece ('w', 'W', 'b', or 'B'), and the second element
+        is the location tuple.
+        """
+        locations = self._geometry.locations
+        pieces = [(index, 'w') for index in _iter_bits(self._white_men)]
+        pieces.extend((index, 'W') for index in _iter_bits(self._white_kings))
+        pieces.extend((index, 'b') for index in _iter_bits(self._black_men))
+        pieces.extend((index, 'B') for index in _iter_bits(self._black_kings))
+        pieces.sort()
+        return [(piece, locations[index]) for index, piece in pieces]
+
+    def get_locations_by_color(self, w_or_b):
+        """Gets a list of piece locations for the specified players.
+
+        :param w_or_b: 'w' for white player pieces, 'b' for black player pieces. Other values invalid.
+        :returns list: List of location tuples
+        """
+        if w_or_b == 'w':
+            pieces = self._white_men | self._white_kings
+        elif w_or_b == 'b':
+            pieces = self._black_men | self._black_kings
+        else:
+            return []
+        locations = self._geometry.locations
+        return [locations[index] for index in _iter_bits(pieces)]
@@ -1,12 +1,134 @@
 from players.console import ConsolePlayer
 from players.simple_ai import SimpleAI
-from threading import Thread
-import copy
+from players.deadline import run_move
+from array import array
+import random
 from random import choice
 
 
+"""
+Squares and pieces.
+
+Only the playable squares are stored, packed row by row into a signed byte array. The square at (row, col) has index
+row * (board_size // 2) + col // 2. Each element is 0 for an empty square, or one of the piece codes below: white
+pieces are positive and black pieces are negative, so a piece belongs to the opponent of another when the product of
+their codes is negative.
+"""
+_PIECE_CODES = {'w': 1, 'W': 2, 'b': -1, 'B': -2}
+_PIECE_CHARS = {0: 0, 1: 'w', 2: 'W', -1: 'b', -2: 'B'}
+
+_ZOBRIST_KEYS = {}  # Zobrist keys per board size, see _zobrist_keys
+_STEP_TABLES = {}  # Adjacency and jump tables per board size, see _step_table
+_LOCATIONS = {}  # Square index to location tuple per board size, see _locations
+_EVALUATION_TABLES = {}  # Evaluation terms of each piece on each square per board size, see _evaluation_table
+
+
+def _locations(board_size):
+    """Gets the location tuple of every square index for a board size.
+
+    :param board_size: Size of the board
+    :returns tuple: Location tuple for each square index
+    """
+    locations = _LOCATIONS.get(board_size)
+    if locations is None:
+        locations = _LOCATIONS[board_size] = tuple((ix, iy) for ix in range(board_size) for iy in range(board_size)
+                                                   if (ix + iy) % 2 == 1)
+    return locations
+
+
+def _zobrist_keys(board_size):
+    """Gets the Zobrist keys for a board size.
+
+    Keys are generated from a fixed, board size specific seed, so hashes are identical across processes and runs.
+
+    :param board_size: Size of the board
+    :returns tuple: List with, for each square index, a list of 64-bit keys indexed by piece code, and the key which is
+    xor'ed in when black is to move.
+    """
+    keys = _ZOBRIST_KEYS.get(board_size)
+    if keys is None:
+        rng = random.Random('CheckerBoard zobrist {}'.format(board_size))
+        square_keys = []
+        for _ in _locations(board_size):
+            piece_keys = [0] * 5
+            for piece in 'wWbB':
+                piece_keys[_PIECE_CODES[piece]] = rng.getrandbits(64)
+            square_keys.append(piece_keys)
+        keys = _ZOBRIST_KEYS[board_size] = (square_keys, rng.getrandbits(64))
+    return keys
+
+
+def _step_table(board_size):
+    """Gets the adjacency and jump table for a board size.
+
+    The table is built once per board size and shared by all boards. For every square and piece it lists the steps the
+    piece can take, in the order white forward-left, white forward-right, black forward-left, black forward-right. Men
+    only step forward, kings step in every direction.
+
+    :param board_size: Size of the board
+    :returns list: List with, for each square index, a list indexed by piece code. Each value is a tuple of
+    (neighbour, landing, landed_piece) tuples, where neighbour is the index of the adjacent square, landing is the index
+    of the square a jump over neighbour lands on (-1 if it is off the board), and landed_piece is the piece code after
+    landing there, ie, promoted to king on the last row.
+    """
+    table = _STEP_TABLES.get(board_size)
+    if table is None:
+        half = board_size // 2
+        white_steps = [(1, -1), (1, 1)]
+        black_steps = [(-1, -1), (-1, 1)]
+        table = []
+        for ix, iy in _locations(board_size):
+            piece_steps = [()] * 5
+            for piece, steps in ((1, white_steps), (-1, black_steps),
+                                 (2, white_steps + black_steps), (-2, white_steps + black_steps)):
+                entries = []
+                for step in steps:
+                    x, y = ix + step[0], iy + step[1]
+                    if not (0 <= x < board_size and 0 <= y < board_size):
+                        continue
+                    xp, yp = x + step[0], y + step[1]
+                    landing = xp * half + yp // 2 if 0 <= xp < board_size and 0 <= yp < board_size else -1
+                    # A pawn is promoted when it reaches the last row
+                    promoted = (xp == board_size - 1 and piece == 1) or (xp == 0 and piece == -1)
+                    entries.append((x * half + y // 2, landing, piece * 2 if promoted else piece))
+                piece_steps[piece] = tuple(entries)
+            table.append(piece_steps)
+        _STEP_TABLES[board_size] = table
+    return table
+
+
+def _evaluation_table(board_size):
+    """Gets the contribution of each piece on each square to the evaluation terms for a board size.
+
+    The evaluation terms of a position are, from white's point of view (white minus black):
+        - men: number of pawns
+        - kings: number of kings
+        - advancement: number of rows each pawn has advanced from its own back rank
+        - back_rank: number of pawns still on their own back rank
+
+    :param board_size: Size of the board
+    :returns list: List with, for each square index, a list indexed by piece code of (men, kings, advancement,
+    back_rank) tuples
+    """
+    table = _EVALUATION_TABLES.get(board_size)
+    if table is None:
+        table = []
+        for ix, _ in _locations(board_size):
+            piece_terms = [(0, 0, 0, 0)] * 5
+            piece_terms[1] = (1, 0, ix, 1 if ix == 0 else 0)
+            piece_terms[2] = (0, 1, 0, 0)
+            piece_terms[-1] = (-1, 0, ix - (board_size - 1), -1 if ix == board_size - 1 else 0)
+            piece_terms[-2] = (0, -1, 0, 0)
+            table.append(piece_terms)
+        _EVALUATION_TABLES[board_size] = table
+    return table
+
+
 class CheckerBoard:
     """The CheckerBoard manages a Checkers match between two players."""
+    __slots__ = ('_board_size', 'current_player', '_end_game_move_count', '_legal_moves', '_squares',
+                 '_white_squares', '_black_squares', 'position_hash', 'evaluation_terms')
+
     def __init__(self, board_size):
         """Inits a CheckerBoard with the specified parameters.
 
@@ -21,38 +143,101 @@ class CheckerBoard:
         self._board_size = board_size
         self.current_player = 'w'
         self._end_game_move_count = 0  # The number of moves since a capture or promotion to king
+        self._legal_moves = None  # Cached result of legal_moves, cleared whenever the board changes
 
         """
         Build board to desired size.
-        
-        The board is represented by a 2D array of characters. Each element is
-        either a 'b', 'B', 'w', 'W', 0, or '_'. These represent a black pawn,
-        black king, white pawn, white king, empty space, or invalid space. 
+
+        The board is represented by a byte array of piece codes, one element per playable square (see _PIECE_CODES).
+        The first (board_size / 2) - 1 rows hold white pawns, the last (board_size / 2) - 1 rows hold black pawns, and
+        the two middle rows are empty.
+        """
+        half = board_size // 2
+        player_squares = (half - 1) * half
+        self._squares = array('b', [1] * player_squares + [0] * (2 * half) + [-1] * player_squares)
+
+        # Locations of each player's pieces as bit masks over the square indexes, kept up to date as moves are made so
+        # they never need a full board scan
+        self._white_squares = (1 << player_squares) - 1
+        self._black_squares = ((1 << player_squares) - 1) << (player_squares + 2 * half)
+
+        # 64-bit Zobrist hash of the position, updated incrementally as moves are made
+        self.position_hash = self.hash_position(self, self.current_player)
+
+        # Evaluation terms of the position (see _evaluation_table), updated incrementally as moves are made so a
+        # position is scored without scanning the board
+        self.evaluation_terms = self.count_evaluation_terms(self)
+
+    @classmethod
+    def from_rows(cls, rows, current_player='w', end_game_move_count=0):
+        """Creates a board in the given position, eg, one loaded from a record.
+
+        :param rows: Position as a 2D array of 'b', 'B', 'w', 'W', 0 or '_', in the format returned by indexing a board
+        :param current_player: Player to move, 'w' or 'b'
+        :param end_game_move_count: The number of moves since a capture or promotion to king
+        :returns CheckerBoard: Board in the given position
+        :raises ValueError: if the number of rows is not an even number or less than 4
+        """
+        board = cls(len(rows))
+        half = board._board_size // 2
+        board._white_squares = board._black_squares = 0
+        for ix, row in enumerate(rows):
+            for iy, i in enumerate(row):
+                if (ix + iy) % 2 == 0:
+                    continue
+                square = ix * half + iy // 2
+                board._squares[square] = _PIECE_CODES[i] if isinstance(i, str) and i.isalpha() else 0
+                if board._squares[square] > 0:
+                    board._white_squares |= 1 << square
+                elif board._squares[square] < 0:
+                    board._black_squares |= 1 << square
+        board.current_player = current_player
+        board._end_game_move_count = end_game_move_count
+        board.position_hash = cls.hash_position(board, current_player)
+        board.evaluation_terms = cls.count_evaluation_terms(board)
+        return board
+
+    def clone(self):
+        """Creates an independent copy of this board.
+
+        The position is copied with a single buffer copy, everything else is immutable and shared.
+
+        :returns CheckerBoard: Copy of this board
+        """
+        board = CheckerBoard.__new__(CheckerBoard)
+        board._board_size = self._board_size
+        board.current_player = self.current_player
+        board._end_game_move_count = self._end_game_move_count
+        board._legal_moves = self._legal_moves  # Never modified in place, so it can be shared
+        board._squares = self._squares[:]
+        board._white_squares = self._white_squares
+        board._black_squares = self._black_squares
+        board.position_hash = self.position_hash
+        board.evaluation_terms = self.evaluation_terms
+        return board
+
+    def __copy__(self):
+        return self.clone()
+
+    def __deepcopy__(self, memo):
+        return self.clone()
+
+    def get_squares(self):
+        """Gets the packed representation of the position.
+
+        There is one byte per playable square, row by row: the square at (row, col) has index
+        row * (board_size // 2) + col // 2. Each byte is 0 for an empty square, 1 for a white pawn, 2 for a white king,
+        -1 for a black pawn and -2 for a black king (as signed bytes).
+
+        :returns bytes: Packed squares
         """
-        self._board = []
-        player_rows = (board_size / 2) - 1
-        # Add white player rows
-        row_ind = 0
-        while row_ind < player_rows:
-            row = ['_' if (j + (row_ind % 2)) % 2 == 0 else 'w' for j in range(board_size)]
-            self._board.append(row)
-            row_ind += 1
-        # Add neutral rows
-        while row_ind < player_rows + 2:
-            row = ['_' if (j + (row_ind % 2)) % 2 == 0 else 0 for j in range(board_size)]
-            self._board.append(row)
-            row_ind += 1
-        # Add black player rows
-        while row_ind < board_size:
-            row = ['_' if (j + (row_ind % 2)) % 2 == 0 else 'b' for j in range(board_size)]
-            self._board.append(row)
-            row_ind += 1
+        return self._squares.tobytes()
 
     def print(self):
         """Prints a representation of the board to the console"""
         board = '   ' + ''.join(['{:^3}'.format(i) for i in range(self._board_size)]) + '\n'
-        board += '\n'.join([''.join(['{:^3}'.format(item) for item in [row_ind] + row])
-                            for row_ind, row in enumerate(self._board)])
+        board += '\n'.join([''.join(['{:^3}'.format(item) for item in [row_ind] + self[row_ind]])
+                            for row_ind in range(self._board_size)])
         print(board)
 
     def execute_move(self, move):
@@ -64,144 +249,253 @@ class CheckerBoard:
         :returns bool: true if move is executed successfully, false otherwise
         """
         # TODO: Check whether move is valid format
-        valid_move = False
-        jump_or_king = False  # Indicates this move was a capture or a promotion to king
-        # Create temp backup of board in case moves need to be undone
-        temp_board = copy.deepcopy(self._board)
-        # Group moves into pairs to handle multiple jumps
-        move_pairs = [[move[i], move[i+1]] for i in range(len(move) - 1)]
-        for pair in move_pairs:
-            if self._validate_move(pair):
-                valid_move = True
-                self._board[pair[1][0]][pair[1][1]] = self._board[pair[0][0]][pair[0][1]]
-                self._board[pair[0][0]][pair[0][1]] = 0
-                # A pawn is promoted when it reaches the last row
-                if ((pair[1][0] == self._board_size - 1 and self.current_player == 'w') or
-                        (pair[1][0] == 0 and self.current_player == 'b')):
-                    # If piece was not already a king, this resets end game counter
-                    if self._board[pair[1][0]][pair[1][1]].islower():
-                        jump_or_king = True
-                    self._board[pair[1][0]][pair[1][1]] = self._board[pair[1][0]][pair[1][1]].upper()
-                # A piece is removed if jumped over
-                if abs(pair[1][0] - pair[0][0]) == 2:
-                    xp = (pair[0][0] + pair[1][0]) // 2
-                    yp = (pair[0][1] + pair[1][1]) // 2
-                    self._board[xp][yp] = 0
-                    jump_or_king = True
-            else:
-                valid_move = False
-                break
-        if valid_move:
-            # If move is valid, rotate to the next player
-            self.current_player = 'w' if self.current_player == 'b' else 'b'
-            if jump_or_king:
-                self._end_game_move_count = 0
-            else:
-                self._end_game_move_count += 1
-        else:
-            # If full move was invalid, restore board to state prior to executing any moves
-            self._board = temp_board
+        if list(move) not in self.legal_moves():
+            return False
+        self.make_move(move)
         # TODO: Log each move
-        return valid_move
+        return True
 
-    def _validate_move(self, move):
-        """Determines whether the move *to* location is a valid end position for piece in *from* location.
+    def make_move(self, move):
+        """Executes move in place without validating it.
 
-        This method generates all valid moves for the starting location in move, and then checks whether the move is in
-        this set. It also checks that the piece at the starting location belongs to the current player.
+        This is intended for search, where moves come from legal_moves and are known to be valid. The returned token
+        can be passed to unmake_move to restore the board exactly, including captured pieces, promotions,
+        current_player and the end game move counter.
 
-        :param move: Move to validate. Tuple in form ((x1,y1),(x2,y2))
-        :returns bool: true if move is valid, false otherwise
+        :param move: Move to execute, as a list of location tuples
+        :returns tuple: Undo token for unmake_move
         """
-        if self.current_player == self._board[move[0][0]][move[0][1]].lower():
-            is_jump, available_moves = self.generate_moves(move[0])
-            if not is_jump:
-                # If this piece does not have any jumps, check if any other pieces have jumps (forced capture rule)
-                pieces = self.get_locations_by_color(self.current_player)
-                for piece in pieces:
-                    is_jump, _ = self.generate_moves(piece)
-                    if is_jump:
-                        return False
-            return move in available_moves
+        half = self._board_size // 2
+        squares = self._squares
+        path = [loc[0] * half + loc[1] // 2 for loc in move]
+        piece = squares[path[0]]
+        token = (path, piece, [], self._end_game_move_count, self.current_player, self._legal_moves,
+                 self.position_hash, self._white_squares, self._black_squares, self.evaluation_terms)
+        square_keys = _zobrist_keys(self._board_size)[0]
+        captured = token[2]
+        moving = piece
+        own_squares = 0
+        opponent_squares = 0
+        for i in range(len(move) - 1):
+            start, end = path[i], path[i + 1]
+            squares[start] = 0
+            self.position_hash ^= square_keys[start][moving]
+            # A pawn is promoted when it reaches the last row
+            if (moving == 1 and move[i + 1][0] == self._board_size - 1) or (moving == -1 and move[i + 1][0] == 0):
+                moving *= 2
+            squares[end] = moving
+            self.position_hash ^= square_keys[end][moving]
+            own_squares ^= (1 << start) | (1 << end)
+            # A piece is removed if jumped over
+            if abs(move[i + 1][0] - move[i][0]) == 2:
+                jumped = ((move[i][0] + move[i + 1][0]) // 2) * half + ((move[i][1] + move[i + 1][1]) // 2) // 2
+                captured.append((jumped, squares[jumped]))
+                self.position_hash ^= square_keys[jumped][squares[jumped]]
+                opponent_squares |= 1 << jumped
+                squares[jumped] = 0
+
+        if piece > 0:
+            self._white_squares ^= own_squares
+            self._black_squares &= ~opponent_squares
         else:
-            return False
+            self._black_squares ^= own_squares
+            self._white_squares &= ~opponent_squares
+        # Only the first and last squares of the path change the moving piece's terms, the squares in between cancel
+        table = _evaluation_table(self._board_size)
+        terms = [term + added - removed for term, added, removed in
+                 zip(self.evaluation_terms, table[path[-1]][moving], table[path[0]][piece])]
+        for square, captured_piece in captured:
+            terms = [term - removed for term, removed in zip(terms, table[square][captured_piece])]
+        self.evaluation_terms = tuple(terms)
+        self.current_player = 'w' if self.current_player == 'b' else 'b'
+        self.position_hash ^= _zobrist_keys(self._board_size)[1]
+        # A capture, or a pawn which was promoted to king, resets the end game counter
+        if len(captured) or moving != piece:
+            self._end_game_move_count = 0
+        else:
+            self._end_game_move_count += 1
+        self._legal_moves = None
+        return token
+
+    def unmake_move(self, token):
+        """Restores the board to its state before the move which returned token was made.
+
+        Moves must be unmade in the reverse order they were made.
+
+        :param token: Undo token returned by make_move
+        """
+        (path, piece, captured, self._end_game_move_count, self.current_player, self._legal_moves,
+         self.position_hash, self._white_squares, self._black_squares, self.evaluation_terms) = token
+        squares = self._squares
+        squares[path[-1]] = 0
+        squares[path[0]] = piece
+        for square, captured_piece in captured:
+            squares[square] = captured_piece
+
+    def legal_moves(self):
+        """Gets all valid moves for the current player.
+
+        Moves for every piece of the current player are generated in one pass, and the forced capture rule is applied:
+        if any piece can jump, only jumps are returned. The result is cached until the board changes, so validating a
+        move, checking for a winner and choosing a random move in the same turn only generate moves once.
+
+        :returns list: List of moves, each a list of location tuples
+        """
+        if self._legal_moves is None:
+            locations = _locations(self._board_size)
+            squares = self._squares
+            table = _step_table(self._board_size)
+            pieces = self._white_squares if self.current_player == 'w' else self._black_squares
+            paths = []
+            jumps = []
+            while pieces:
+                low = pieces & -pieces
+                pieces ^= low
+                square = low.bit_length() - 1
+                jumps.extend(self._jump_paths(square, squares[square], squares, table))
+                if len(jumps) == 0:
+                    paths.extend([square, neighbour] for neighbour, _, _ in table[square][squares[square]]
+                                 if squares[neighbour] == 0)
+            self._legal_moves = [[locations[square] for square in path] for path in (jumps if len(jumps) else paths)]
+        return list(self._legal_moves)
+
+    @staticmethod
+    def hash_position(board, current_player):
+        """Computes the Zobrist hash of a position from scratch.
+
+        This gives the same value as the position_hash attribute of a CheckerBoard in the same position, so it can be
+        used for positions loaded from records.
+
+        :param board: Position as a 2D array of 'b', 'B', 'w', 'W', 0 or '_', eg, a CheckerBoard or a list of its rows
+        :param current_player: Player to move, 'w' or 'b'
+        :returns int: 64-bit hash of the position
+        """
+        rows = list(board)
+        half = len(rows) // 2
+        square_keys, black_to_move_key = _zobrist_keys(len(rows))
+        position_hash = black_to_move_key if current_player == 'b' else 0
+        for ix, row in enumerate(rows):
+            for iy, i in enumerate(row):
+                if isinstance(i, str) and i.isalpha():
+                    position_hash ^= square_keys[ix * half + iy // 2][_PIECE_CODES[i]]
+        return position_hash
+
+    @staticmethod
+    def count_evaluation_terms(board):
+        """Computes the evaluation terms of a position from scratch.
+
+        This gives the same value as the evaluation_terms attribute of a CheckerBoard in the same position.
+
+        :param board: Position as a 2D array of 'b', 'B', 'w', 'W', 0 or '_', eg, a CheckerBoard or a list of its rows
+        :returns tuple: Evaluation terms (men, kings, advancement, back_rank), white minus black
+        """
+        rows = list(board)
+        half = len(rows) // 2
+        table = _evaluation_table(len(rows))
+        terms = [0, 0, 0, 0]
+        for ix, row in enumerate(rows):
+            for iy, i in enumerate(row):
+                if isinstance(i, str) and i.isalpha():
+                    terms = [term + added for term, added in zip(terms, table[ix * half + iy // 2][_PIECE_CODES[i]])]
+        return tuple(terms)
+
+    def check_evaluation_terms(self):
+        """Checks the incrementally updated evaluation terms against a full recomputation, for debugging.
+
+        :raises AssertionError: if the evaluation terms differ from the terms computed from scratch
+        """
+        expected = self.count_evaluation_terms(self)
+        if self.evaluation_terms != expected:
+            raise AssertionError('Incremental evaluation terms {} differ from recomputed terms {}'
+                                 .format(self.evaluation_terms, expected))
 
     def get_winner(self):
         """Checks for end game status and returns winner.
 
         :returns str: 'w' if white wins, 'b' if black wins, 'd' if draw, None otherwise
         """
-        pieces = self.get_locations_by_color(self.current_player)
-        move_count = sum([len(self.generate_moves(piece)[1]) for piece in pieces])
-        if move_count == 0:
-            return 'b' if self.current_player == 'w' else 'w'
+        opponent_player = 'w' if self.current_player == 'b' else 'b'
+        if len(self.legal_moves()) == 0:
+            return opponent_player
         if self._end_game_move_count == 40:
-            opponent_player = 'w' if self.current_player == 'b' else 'w'
-            opponent_pieces = self.get_locations_by_color(opponent_player)
-            if len(pieces) > len(opponent_pieces):
+            pieces = bin(self._white_squares if self.current_player == 'w' else self._black_squares).count('1')
+            opponent_pieces = bin(self._black_squares if self.current_player == 'w' else self._white_squares).count('1')
+            if pieces > opponent_pieces:
                 return self.current_player
-            elif len(opponent_pieces) > len(pieces):
+            elif opponent_pieces > pieces:
                 return opponent_player
             else:
                 return 'd'
         return None
 
-    def generate_moves(self, loc, start_board=None):
+    def generate_moves(self, loc):
         """Generates list of valid moves for the piece at loc.
 
         Valid moves for the piece at loc. Moves are represented as a list of locations, eg, [(x1,y1),(x2,y2)], including
-        the starting location. If a board is provided, only valid jumps (not all moves) will be returned. The intention
-        is a board is only provided when this is called recursively, checking for multiple jumps.
+        the starting location.
 
         :param loc: Location of piece to check
-        :param start_board: Board to generate moves for. If not provided, current board state is used.
         :return tuple: First element is boolean indicating whether the moves are jumps or not. Second element is a list
         of location tuples which the piece at loc can move to.
         """
-        jumps_only = True
-        if start_board is None:
-            start_board = self._board
-            jumps_only = False
-        moves = []
+        if (loc[0] + loc[1]) % 2 == 0:
+            return False, []
+        locations = _locations(self._board_size)
+        squares = self._squares
+        table = _step_table(self._board_size)
+        square = loc[0] * (self._board_size // 2) + loc[1] // 2
+        jumps = self._jump_paths(square, squares[square], squares, table)
+        if len(jumps) > 0:
+            return True, [[locations[jump_square] for jump_square in jump] for jump in jumps]
+        return False, [[loc, locations[neighbour]] for neighbour, _, _ in table[square][squares[square]]
+                       if squares[neighbour] == 0]
+
+    @classmethod
+    def _jump_paths(cls, square, piece, squares, table):
+        """Generates all single and multiple jumps for a piece.
+
+        Each jump is made in place on squares while its extensions are searched, and undone afterwards, so squares is
+        unchanged when this returns.
+
+        :param square: Index of the square the piece is on
+        :param piece: Code of the piece
+        :param squares: Squares to generate jumps for
+        :param table: Step table for the board size
+        :return list: List of jumps, each a list of square indexes
+        """
         jumps = []
-        move_piece = start_board[loc[0]][loc[1]].lower()
-        for step in self._generate_steps(loc, start_board):
-            board = copy.deepcopy(start_board)  # create copy to test jumps on
-            x, y = loc[0] + step[0], loc[1] + step[1]
-            if 0 <= x < self._board_size and 0 <= y < self._board_size:
-                if isinstance(board[x][y], str) and board[x][y].lower() == ('w' if move_piece == 'b' else 'b'):
-                    xp, yp = x + step[0], y + step[1]
-                    if (0 <= xp < self._board_size and 0 <= yp < self._board_size and
-                            board[xp][yp] == 0):
-                        # Move starting piece to end location
-                        board[xp][yp] = board[loc[0]][loc[1]]
-                        # Set starting and jumped piece to empty
-                        board[loc[0]][loc[1]] = board[x][y] = 0
-                        # A pawn is promoted when it reaches the last row
-                        if (xp == self._board_size - 1 and move_piece == 'w') or (xp == 0 and move_piece == 'b'):
-                            board[xp][yp] = board[xp][yp].upper()
-
-                        jumps.append([loc, (xp, yp)])
-                        jumps.extend([[loc] + jump_extension
-                                      for jump_extension in self.generate_moves((xp, yp), board)[1]])
-                elif board[x][y] == 0 and not jumps_only:
-                    moves.append([loc, (x, y)])
-        return (True, jumps) if len(jumps) or jumps_only > 0 else (False, moves)
+        for jumped_square, landing, landed_piece in table[square][piece]:
+            if landing < 0 or squares[landing] != 0:
+                continue
+            jumped = squares[jumped_square]
+            if jumped * piece < 0:
+                # Move starting piece to end location (promoting it if needed), and set starting and jumped piece to
+                # empty
+                squares[square] = squares[jumped_square] = 0
+                squares[landing] = landed_piece
 
-    @staticmethod
-    def _generate_steps(loc, board):
-        char = board[loc[0]][loc[1]]
-        white_steps = [(1, -1), (1, 1)]
-        black_steps = [(-1, -1), (-1, 1)]
-        steps = []
-        if char != 'b':
-            steps.extend(white_steps)
-        if char != 'w':
-            steps.extend(black_steps)
-        return steps
+                jumps.append([square, landing])
+                jumps.extend([[square] + extension for extension in cls._jump_paths(landing, landed_piece, squares,
+                                                                                   table)])
+
+                # Undo the jump
+                squares[landing] = 0
+                squares[jumped_square] = jumped
+                squares[square] = piece
+        return jumps
 
     def __getitem__(self, item):
-        return self._board[item]
+        """Gets a row of the board as a list of 'b', 'B', 'w', 'W', 0 or '_'.
+
+        The row is built on request, so changing it does not change the board.
+        """
+        if item < 0:
+            item += self._board_size
+        if not 0 <= item < self._board_size:
+            raise IndexError('board row index out of range')
+        offset = item * (self._board_size // 2)
+        return ['_' if (iy + item) % 2 == 0 else _PIECE_CHARS[self._squares[offset + iy // 2]]
+                for iy in range(self._board_size)]
 
     def get_pieces(self):
         """Gets a list of all player pieces on the board.
@@ -209,10 +503,15 @@ class CheckerBoard:
         :returns list: List of tuples where first element is the piece ('w', 'W', 'b', or 'B'), and the second element
         is the location tuple.
         """
-        return [(i, (ix, iy))
-                for ix, row in enumerate(self._board)
-                for iy, i in enumerate(row)
-                if isinstance(i, str) and i.isalpha()]
+        locations = _locations(self._board_size)
+        pieces = []
+        squares = self._white_squares | self._black_squares
+        while squares:
+            low = squares & -squares
+            squares ^= low
+            square = low.bit_length() - 1
+            pieces.append((_PIECE_CHARS[self._squares[square]], locations[square]))
+        return pieces
 
     def get_locations_by_color(self, w_or_b):
         """Gets a list of piece locations for the specified players.
@@ -220,10 +519,19 @@ class CheckerBoard:
         :param w_or_b: 'w' for white player pieces, 'b' for black player pieces. Other values invalid.
         :returns list: List of location tuples
         """
-        return [(ix, iy)
-                for ix, row in enumerate(self._board)
-                for iy, i in enumerate(row)
-                if isinstance(i, str) and i.lower() == w_or_b]
+        if w_or_b == 'w':
+            squares = self._white_squares
+        elif w_or_b == 'b':
+            squares = self._black_squares
+        else:
+            return []
+        locations = _locations(self._board_size)
+        pieces = []
+        while squares:
+            low = squares & -squares
+            squares ^= low
+            pieces.append(locations[low.bit_length() - 1])
+        return pieces
 
 
 def main():
@@ -237,25 +545,13 @@ def main():
         player_piece, player = players[move_ind % 2]
         print('{} turn ({}):'.format(player.get_name(), 'white' if player_piece == 'w' else 'black'))
         cb.print()
-        # Start a new thread to wait for Player move
-        ret_val = []  # list representing move returned from player
-        t = Thread(target=player.move, args=(copy.deepcopy(cb), time_limit, ret_val))
-        t.start()
-        t.join(time_limit)
+        # Run the player's move on a new thread, and stop it when the time limit expires
+        ret_val = run_move(player, cb.clone(), time_limit)
         if not cb.execute_move(ret_val):
             print('Invalid move {} by player {}'
                   .format(ret_val, player.get_name()))
             # Choose random valid move, taking into account forced capture
-            pieces = cb.get_locations_by_color(player_piece)
-            moves = []
-            jumps = []
-            for piece in pieces:
-                is_jump, piece_moves = cb.generate_moves(piece)
-                if is_jump:
-                    jumps.extend(piece_moves)
-                else:
-                    moves.extend(piece_moves)
-            move = choice(jumps) if len(jumps) > 0 else choice(moves)
+            move = choice(cb.legal_moves())
             cb.execute_move(move)
             print('Playing random move instead: {}'.format(move))
         move_ind += 1
@@ -13,8 +13,7 @@ CHANGE LOG:
 from board import CheckerBoard
 from players.interface import AbstractPlayer
 from players.simple_ai import SimpleAI
-from threading import Thread
-import copy
+from players.deadline import run_move
 from random import choice
 import pygame
 
@@ -57,47 +56,51 @@ class CheckerBoardGUI:
         self._cb = CheckerBoard(self._board_size)
 
         # 2. Setup the gui
-        self._setup_window()
+        self._renderer = BoardRenderer(self._board_size)
 
     def play(self):
         move_ind = 0
         # Loop until end game conditions met
         while not self._cb.get_winner():
-            self._update()
+            self._renderer.update(self._cb)
             player_piece, player = self._players[move_ind % 2]
-            # Start a new thread to wait for Player move
-            ret_val = []  # list representing move returned from player
-            t = Thread(target=player.move, args=(copy.deepcopy(self._cb), self._time_limit, ret_val))
-            t.start()
-            t.join(self._time_limit)
+            # Run the player's move on a new thread, and stop it when the time limit expires
+            ret_val = run_move(player, self._cb.clone(), self._time_limit)
             if not self._cb.execute_move(ret_val):
                 print('Invalid move {} by player {}'
                       .format(ret_val, player.get_name()))
                 # Choose random valid move, taking into account forced capture
-                pieces = self._cb.get_locations_by_color(player_piece)
-                moves = []
-                jumps = []
-                for piece in pieces:
-                    is_jump, piece_moves = self._cb.generate_moves(piece)
-                    if is_jump:
-                        jumps.extend(piece_moves)
-                    else:
-                        moves.extend(piece_moves)
-                move = choice(jumps) if len(jumps) > 0 else choice(moves)
+                move = choice(self._cb.legal_moves())
                 self._cb.execute_move(move)
                 print('Playing random move instead: {}'.format(move))
             move_ind += 1
 
-    def _setup_window(self):
+
+class BoardRenderer:
+    """Draws a checker board in a pygame window.
+
+    A BoardRenderer can be attached to a board_server.GameEngine to watch a game: update is called after every move and
+    game_over closes the window. pygame is not thread-safe, so a renderer must only be used by one game and thread.
+    """
+    def __init__(self, board_size, window_size=600):
+        """Inits a BoardRenderer, opening its window.
+
+        :param board_size: Size of the boards which will be drawn
+        :param window_size: Width and height of the window in pixels
+        """
+        self._board_size = board_size
         pygame.init()
-        window_size = 600
         self._square_size = window_size // self._board_size
         self._screen = pygame.display.set_mode((window_size, window_size))
         font = pygame.font.Font(None, 28)
         self._white_king_text = font.render('K', True, BLACK)
         self._black_king_text = font.render('K', True, WHITE)
 
-    def _update(self):
+    def update(self, board):
+        """Draws a position.
+
+        :param board: CheckerBoard to draw
+        """
         # Draw board background
         for row in range(self._board_size):
             for col in range(self._board_size):
@@ -107,7 +110,7 @@ class CheckerBoardGUI:
                                                      self._square_size, self._square_size))
 
         # Draw pieces
-        for piece in self._cb.get_pieces():
+        for piece in board.get_pieces():
             color = WHITE if piece[0].lower() == 'w' else BLACK
             x = piece[1][1] * self._square_size + self._square_size // 2
             y = piece[1][0] * self._square_size + self._square_size // 2
@@ -120,6 +123,14 @@ class CheckerBoardGUI:
 
         pygame.display.update()
 
+    def game_over(self, winner):
+        self.close()
+
+    def close(self):
+        """Closes the window."""
+        pygame.display.quit()
+        pygame.quit()
+
 
 def main():
     """ main()
@@ -1,36 +1,114 @@
 """
-board_gui.py
-    - Main callable method for executing a local simulation with a PyGame GUI.
+board_server.py
+    - Headless game engine for server-run games.
 
 Anthony Trezza
 20 Dec 2017
 
 CHANGE LOG:
     - 20 Dec 2017 trezza - Software Birthday <(^.^)>
+
+The game engine only keeps the rules of the game: it does not draw anything and does not need pygame or a display.
+Rendering is an observer which can be attached to a game, eg, board_gui.BoardRenderer, and is told about every move.
 """
 
-from board_gui import CheckerBoardGUI
 from board import CheckerBoard
 from utils.jsonsocket import *
 from msgs.messages import *
 
-from threading import Thread
 import socket
-import copy
-import time
 from random import choice
-import pygame
-
 
-# Predefined Color Templates for the GUI
-BLACK = (0, 0, 0)
-WHITE = (255, 255, 255)
-GREEN = (0, 128, 0)
-CREAM = (255, 245, 180)
 
+class GameEngine:
+    """Referee of a game between two remote players, without any rendering.
+
+    Observers are objects with an update(board) method, called with the CheckerBoard after every move (and when
+    attached), and a game_over(winner) method, called when the game ends. Observers must not modify the board.
+    """
+    def __init__(self, board_size=10):
+        """Inits a GameEngine with the specified parameters.
+
+        :param board_size: Size of the square board to be used. Must be even and >= 4.
+        :raises ValueError: if board_size is not an even number or less than 4
+        """
+        self.board = CheckerBoard(board_size)
+        self.board_size = board_size
+        self.move_ind = 0
+        self.winner = None
+        self._observers = []
+
+    def attach(self, observer):
+        """Attaches an observer, which is immediately updated with the current position."""
+        self._observers.append(observer)
+        observer.update(self.board)
+
+    def detach(self, observer):
+        """Detaches an observer. It is not told the game is over."""
+        self._observers.remove(observer)
+
+    @staticmethod
+    def read_move(data):
+        """Reads the move of a message received from a player.
+
+        :param data: Message dictionary, which should be a Move message
+        :returns list: Move, as a list of location tuples, or None if the message is not a valid Move message
+        """
+        move = Move()
+        try:
+            move.from_dict(data)
+            move_list = [tuple(loc) for loc in move.move_list]
+        except (TypeError, AttributeError):
+            return None
+        if move.id != MESSAGE_IDS["MOVE"].value or len(move_list) == 0:
+            return None
+        return move_list
+
+    def random_move(self):
+        # Choose random valid move for the player to move, taking into account forced capture
+        move = choice(self.board.legal_moves())
+        print('[.] Playing random move: {}'.format(move))
+        return move
 
-class CheckerBoardServer(CheckerBoardGUI):
-    def __init__(self, player_sockets, player_names, time_limit):
+    def play_move(self, move_list):
+        """Plays a move of the player to move, or a random move instead if it is invalid.
+
+        :param move_list: Move received from the player, or None if it did not send a valid move in time
+        :returns list: Move played
+        """
+        if move_list is not None and self.board.execute_move(move_list):
+            move_list = list(move_list)
+        else:
+            if move_list is not None:
+                print("[!] Invalid move {}, received from {}, random move will be generated...".format(
+                    move_list, self.board.current_player))
+            move_list = self.random_move()
+            self.board.execute_move(move_list)
+        self._after_move()
+        return move_list
+
+    def _after_move(self):
+        """Updates the observers, and ends the game if the move ended it."""
+        self.move_ind += 1
+        for observer in list(self._observers):
+            observer.update(self.board)
+        winner = self.board.get_winner()
+        if winner:
+            self.end(winner)
+
+    def end(self, winner):
+        """Ends the game, eg, when it is won or a player disconnects, and tells the observers.
+
+        :param winner: 'w', 'b', 'd' for a draw or None if the game was stopped without a result
+        """
+        self.winner = winner
+        for observer in list(self._observers):
+            observer.game_over(winner)
+
+
+class CheckerBoardServer(GameEngine):
+    """A game between two players connected with blocking sockets, played by play on the calling thread."""
+    def __init__(self, player_sockets, player_names, time_limit, board_size=10):
         # 0. Input Checking
         if len(player_sockets) != 2:
             raise ValueError('Invalid number of players!')
@@ -38,9 +116,11 @@ class CheckerBoardServer(CheckerBoardGUI):
             if not isinstance(player, socket.socket):
                 raise TypeError('player is not a socket handle')
 
-        # 1. Initialize the input class parameters
+        # 1. Setup the Checker Board
+        super().__init__(board_size)
+
+        # 2. Initialize the input class parameters
         self.game_over = False
-        self._board_size = 10
         self._time_limit = time_limit
         self._num_players = 2
 
@@ -52,163 +132,63 @@ class CheckerBoardServer(CheckerBoardGUI):
             player.settimeout(self._time_limit)
             self._players.append((player_info[idx], player))
 
-        # 3. Setup the Checker Board
-        self._cb = CheckerBoard(self._board_size)
-
-        # 2. Setup the gui
-        self._setup_window()
-
     def terminate_game(self):
         self.game_over = True
-        pygame.display.quit()
-        pygame.quit()
-
-    def random_move(self, player_info):
-        # Choose random valid move, taking into account forced capture
-        pieces = self._cb.get_locations_by_color(player_info)
-        moves = []
-        jumps = []
-        for piece in pieces:
-            is_jump, piece_moves = self._cb.generate_moves(piece)
-            if is_jump:
-                jumps.extend(piece_moves)
-            else:
-                moves.extend(piece_moves)
-        move = choice(jumps) if len(jumps) > 0 else choice(moves)
-        print('[.] Playing random move: {}'.format(move))
-        return move
+
+    def _send_all(self, message):
+        for tmp_player_info, tmp_player in self._players:
+            try:
+                json_send(tmp_player, dict(message))
+            except (ConnectionResetError, BrokenPipeError):
+                pass
 
     def play(self):
         # Send the rules and the begin game messages!
-        gr = GameRules(player_color=None, num_players=self._num_players, time_limit=self._time_limit, board_size=self._board_size)
+        gr = GameRules(player_color=None, num_players=self._num_players, time_limit=self._time_limit,
+                       board_size=self.board_size)
         bg = BeginGame()
-        success = False
-        i = 0
-        for player_info, player in self._players:
+        for idx, (player_info, player) in enumerate(self._players):
             gr.player_color = player_info[0]
             try:
                 json_send(player, dict(gr))
                 json_send(player, dict(bg))
-                success = True
-                i += 1
-            except ConnectionResetError:
+            except (ConnectionResetError, BrokenPipeError):
                 print("[-] Player: {} Disconnected.".format(player_info))
-                del self._players[i]
-                success = False
-                break
-
-        if not success:
-            for player_info, player in self_players:
-                json_send(player, dict(ErrorMessage(ERRORS.OPPONENT_DISCONNECTED)))
+                del self._players[idx]
+                self._send_all(ErrorMessage(ERRORS.OPPONENT_DISCONNECTED))
+                self.end('b' if player_info == 'w' else 'w')
                 self.game_over = True
+                break
 
-        move_ind = 0
-        winner = None
         # Loop until end game conditions met
         while not self.game_over:
+            player_info, player = self._players[self.move_ind % 2]
             try:
-                self._update()
-
-                player_info, player = self._players[move_ind % 2]
-
-                # Send the 'your turn' message
+                # Send the 'your turn' message, and read the move
                 json_send(player, dict(YourTurn()))
-
-                # Read the move
-                move = Move()
-                data = json_recv(player)
-                move.from_dict(data)
-
-                for i in range(len(move.move_list)):
-                    move.move_list[i] = tuple(move.move_list[i])
-
-                if move is None or move.id != MESSAGE_IDS["MOVE"].value or len(move.move_list) == 0:
+                move_list = self.read_move(json_recv(player))
+                if move_list is None:
                     print("[!] Invalid Message Received from {}".format(player_info))
                     print("[.] Generating random move...")
-                    move.move_list = self.random_move(player_info)
-
-                    for tmp_player_info, tmp_player in self._players:
-                        json_send(tmp_player, dict(move))
-
-                    self._cb.execute_move(move.move_list)
-                    move_ind += 1
-
-                    winner = self._cb.get_winner()
-                    if winner:
-                        self.game_over = True
-                        break
-                    else:
-                        continue
-
-                # Make the move (unless it is invalid)
-                if not self._cb.execute_move(move.move_list):
-                    print("[!] Invalid move {}, received from {}, random move will be generated...".format(move.move_list, player_info))
-                    move.move_list = self.random_move(player_info)
-
-                    for tmp_player_info, tmp_player in self._players:
-                        json_send(tmp_player, dict(move))
-
-                    self._cb.execute_move(move.move_list)
-                    move_ind += 1
-
-                    winner = self._cb.get_winner()
-                    if winner:
-                        self.game_over = True
-                        break
-                    else:
-                        continue
-
-                # If it made it this far, then the move succeeded!
-                # Send the official move to the players and continue!
-                for tmp_player_info, tmp_player in self._players:
-                    json_send(tmp_player, dict(move))
-
-                move_ind += 1
-
-                winner = self._cb.get_winner()
-                if winner:
-                    self.game_over = True
-                    break
-                else:
-                    continue
-
-            except KeyboardInterrupt:
-                self.game_over = True
-
-            except ConnectionResetError:
-                print("[!] Player: {} Disconnected.".format(player_info))
-                del self._players[(move_ind + 1 )% 2]
-                for player_info, player in self._players:
-                    json_send(player, dict(ErrorMessage(ERRORS.OPPONENT_DISCONNECTED)))
-                    self.game_over = True
-                    winner = self._colors[move_ind + 1 % 2]
-                break
-
             except socket.timeout:
                 print('[!] Socket Timed Out - Random Move made for ' + player_info[0])
-                move.move_list = self.random_move(player_info)
-
-                for tmp_player_info, tmp_player in self._players:
-                    json_send(tmp_player, dict(move))
-
-                self._cb.execute_move(move.move_list)
-                move_ind += 1
-
-                winner = self._cb.get_winner()
-                if winner:
-                    self.game_over = True
-                    break
-                else:
-                    continue
-
-            except e:
-                print("[!] Unexpected Error!" + e)
-                print("[.] Terminating...")
+                move_list = None
+            except (ConnectionResetError, BrokenPipeError):
+                print("[!] Player: {} Disconnected.".format(player_info))
+                del self._players[self.move_ind % 2]
+                self._send_all(ErrorMessage(ERRORS.OPPONENT_DISCONNECTED))
+                self.end('b' if player_info == 'w' else 'w')
                 break
 
-        print("[.] Congratulations {} You are the Winner!".format(winner))
-        go = GameOver(winner)
-        for tmp_player_info, tmp_player in self._players:
-            json_send(tmp_player, dict(go))
+            # Make the move (a random move if it is invalid), and send the official move to the players
+            move_list = self.play_move(move_list)
+            self._send_all(Move(move_list))
+            if self.winner:
+                self.game_over = True
 
-        self.terminate_game()
\ No newline at end of file
+        if not self.winner:
+            # Stopped by terminate_game, tell the observers the game ended without a result
+            self.end(None)
+        print("[.] Congratulations {} You are the Winner!".format(self.winner))
+        self._send_all(GameOver(self.winner))
+        self.terminate_game()
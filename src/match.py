@@ -0,0 +1,286 @@
+"""
+match.py
+    - Headless match runner for AI vs AI evaluation.
+
+A match is a series of games between two player classes, played without a GUI or console prompts. The games are run
+across a pool of worker processes, one game per worker at a time, with the colours alternated: player 1 is white in the
+even numbered games and black in the odd numbered ones. Each result is reported as soon as its game finishes.
+
+Where the operating system supports it, and there are at least as many CPUs as workers, the CPUs are split between the
+workers and each game is pinned to its own share, so the games do not contend for CPUs.
+
+Usage:
+    python match.py players.simple_ai.SimpleAI players.mcts.MCTSPlayer --games 100 --workers 4
+    python match.py players.simple_ai.SimpleAI players.mcts.MCTSPlayer --size 10 --time 0.5 --output results.jsonl
+"""
+import argparse
+import collections
+import importlib
+import json
+import multiprocessing
+import os
+import time
+from random import choice
+
+from board import CheckerBoard
+from players.interface import AbstractPlayer
+from players.deadline import STOP_GRACE, run_move
+from players.isolation import IsolatedPlayer
+
+# Result of a single game:
+#   - game: index of the game in the match. Player 1 is white in even numbered games.
+#   - white, black: names of the players
+#   - winner: 'w', 'b' or 'd' for a draw
+#   - plies: number of moves made
+#   - termination: 'no_moves' if the loser had no legal move, 'move_limit' if there was no capture or promotion in the
+#     last 40 moves and the player with more pieces won
+#   - think_times: time in seconds each move took, in the order the moves were made, starting with white
+#   - invalid_moves: number of invalid moves (replaced by a random move) made by white and by black
+GameResult = collections.namedtuple('GameResult', ('game', 'white', 'black', 'winner', 'plies', 'termination',
+                                                   'think_times', 'invalid_moves'))
+
+# Queue of the CPU sets free for a game in a worker process of create_pool, or None if games are not pinned
+_free_cpus = None
+
+
+def play_game(white, black, board_size, time_limit, game=0, isolation=None, cpus=None):
+    """Plays a single game between two player classes, in this process unless they are isolated.
+
+    Each move is run with run_move, so players which accept a deadline are stopped when their time runs out. An
+    invalid move, or no move at all, is replaced by a random legal move.
+
+    :param white: Class of the white player
+    :param black: Class of the black player
+    :param board_size: Size of the square board to be used. Must be even and >= 4.
+    :param time_limit: Time in seconds each player has to move
+    :param game: Index of the game, copied to the result
+    :param isolation: Dictionary of IsolatedPlayer keyword arguments, eg, {'memory_limit_mb': 512}, to run each player
+    in its own subprocess with them, or None to run the players in this process
+    :param cpus: Set of CPU indexes this process, and the subprocesses it starts, is pinned to, or None to leave it.
+    Isolated players are each pinned to their own half of them, or of isolation['cpus'] if cpus is None, when there
+    are at least 2.
+    :returns GameResult: Result of the game
+    :raises TypeError: if white or black is not a subclass of AbstractPlayer
+    """
+    if not issubclass(white, AbstractPlayer):
+        raise TypeError('White player did not implement AbstractPlayer')
+    elif not issubclass(black, AbstractPlayer):
+        raise TypeError('Black player did not implement AbstractPlayer')
+    if cpus is not None:
+        os.sched_setaffinity(0, cpus)
+    cb = CheckerBoard(board_size)
+    if isolation is None:
+        players = [white(board_size, 1), black(board_size, 2)]
+    else:
+        # Each player thinks on its own CPUs, so a player which is not stopped promptly does not slow its opponent down
+        shared = cpus if cpus is not None else isolation.get('cpus')
+        halves = split_cpus(2, shared) if shared is not None else None
+        players = [IsolatedPlayer(player, board_size, player_num,
+                                  **(isolation if halves is None else dict(isolation, cpus=halves[player_num - 1])))
+                   for player_num, player in ((1, white), (2, black))]
+    think_times = []
+    invalid_moves = [0, 0]
+    try:
+        while cb.get_winner() is None:
+            index = len(think_times) % 2
+            start = time.monotonic()
+            # An isolated player returns at most kill_grace after its deadline, once its subprocess is killed
+            ret_val = run_move(players[index], cb.clone(), time_limit,
+                               getattr(players[index], 'kill_grace', 0) + STOP_GRACE)
+            think_times.append(time.monotonic() - start)
+            if not cb.execute_move(ret_val):
+                invalid_moves[index] += 1
+                cb.execute_move(choice(cb.legal_moves()))
+    finally:
+        for player in players:
+            # Players with background resources, eg, SimpleAI's parallel search, release them in close
+            close = getattr(player, 'close', None)
+            if close is not None:
+                close()
+    return GameResult(game, players[0].get_name(), players[1].get_name(), cb.get_winner(), len(think_times),
+                      'no_moves' if len(cb.legal_moves()) == 0 else 'move_limit', tuple(think_times),
+                      tuple(invalid_moves))
+
+
+def _play_game_task(args):
+    """Plays a game of a match in a worker process. args are the arguments of play_game."""
+    return play_pinned_game(*args)
+
+
+def split_cpus(parts, cpus=None):
+    """Splits CPUs into disjoint sets of the same size. Left over CPUs are not used.
+
+    :param parts: Number of sets
+    :param cpus: CPU indexes to split, or None for the CPUs this process may run on
+    :returns list: parts sets of CPU indexes, or None if there are fewer CPUs than parts
+    """
+    if cpus is None:
+        cpus = os.sched_getaffinity(0) if hasattr(os, 'sched_getaffinity') else range(os.cpu_count() or 1)
+    cpus = sorted(cpus)
+    size = len(cpus) // parts
+    if size == 0:
+        return None
+    return [set(cpus[part * size:(part + 1) * size]) for part in range(parts)]
+
+
+def create_pool(workers, cpus=None, maxtasksperchild=None):
+    """Creates a pool of worker processes to play games in with play_pinned_game.
+
+    If the CPUs can be split between the workers and sched_setaffinity is supported, each game is pinned to a share of
+    the CPUs no other game is using. Otherwise the games are not pinned, and the operating system schedules them.
+
+    :param workers: Number of worker processes
+    :param cpus: CPU indexes to play the games on, defaults to the CPUs this process may run on
+    :param maxtasksperchild: Number of games a worker process plays before it is replaced, unlimited if None
+    :returns multiprocessing.Pool: Pool of workers
+    """
+    shares = split_cpus(workers, cpus) if hasattr(os, 'sched_setaffinity') else None
+    free_cpus = None
+    if shares is not None:
+        free_cpus = multiprocessing.Queue()
+        for share in shares:
+            free_cpus.put(share)
+    return multiprocessing.Pool(workers, _init_worker, (free_cpus,), maxtasksperchild)
+
+
+def _init_worker(free_cpus):
+    global _free_cpus
+    _free_cpus = free_cpus
+
+
+def play_pinned_game(*args):
+    """Plays a game with play_game in a worker process of create_pool, pinned to CPUs free for it if games are pinned.
+
+    There are as many CPU sets as workers, and a worker plays one game at a time, so a set is always free.
+
+    :param args: Arguments of play_game, without cpus
+    :returns GameResult: Result of the game
+    """
+    if _free_cpus is None:
+        return play_game(*args)
+    cpus = _free_cpus.get()
+    try:
+        return play_game(*args, cpus=cpus)
+    finally:
+        _free_cpus.put(cpus)
+
+
+def run_match(player1, player2, board_size, time_limit, games, workers=None, isolation=None, cpus=None):
+    """Plays a match between two player classes across a pool of worker processes.
+
+    Each worker plays one game at a time, pinned to its own CPUs where supported, so workers should not exceed the
+    number of CPUs or the players' think times will be contended. Player classes must be importable by the workers, ie,
+    defined at module level, and must not start worker processes of their own, eg, SimpleAI with search='parallel'.
+
+    :param player1: Class of the first player, white in even numbered games
+    :param player2: Class of the second player, white in odd numbered games
+    :param board_size: Size of the square board to be used. Must be even and >= 4.
+    :param time_limit: Time in seconds each player has to move
+    :param games: Number of games to play
+    :param workers: Number of worker processes, defaults to the number of CPUs
+    :param isolation: Dictionary of IsolatedPlayer keyword arguments to run each player in its own subprocess, or None
+    to run the players in the worker processes
+    :param cpus: CPU indexes to play the games on, split between the workers, defaults to the CPUs this process may run
+    on
+    :returns generator: GameResult of each game, in the order the games finish
+    """
+    tasks = [(player1, player2, board_size, time_limit, game, isolation) if game % 2 == 0 else
+             (player2, player1, board_size, time_limit, game, isolation) for game in range(games)]
+    with create_pool(min(workers or os.cpu_count() or 1, max(games, 1)), cpus) as pool:
+        for result in pool.imap_unordered(_play_game_task, tasks):
+            yield result
+
+
+def player1_score(result):
+    """Gets the score of player 1 in a game of a match: 1 for a win, 0.5 for a draw and 0 for a loss."""
+    if result.winner == 'd':
+        return 0.5
+    return 1 if (result.winner == 'w') == (result.game % 2 == 0) else 0
+
+
+def load_player(path):
+    """Loads a player class from its dotted path, eg, 'players.simple_ai.SimpleAI'.
+
+    :raises ValueError: if path does not name a class in a module
+    """
+    module_name, _, class_name = path.rpartition('.')
+    if not module_name:
+        raise ValueError('Player must be given as module.Class, eg, players.simple_ai.SimpleAI')
+    return getattr(importlib.import_module(module_name), class_name)
+
+
+def add_isolation_arguments(parser):
+    """Adds the command line arguments which pin the games to CPUs and run each player in its own subprocess.
+
+    See parse_cpus and isolation_settings.
+    """
+    parser.add_argument('--cpus', type=parse_cpus,
+                        help='CPUs to play the games on, eg, 0-3,6, split between the workers and, when isolated, '
+                             'between the two players of each game (default: all)')
+    parser.add_argument('--isolate', action='store_true',
+                        help='Run each player in its own subprocess, killed if it does not stop at its deadline')
+    parser.add_argument('--cpu-time', type=float, help='CPU seconds each isolated player may use in a game')
+    parser.add_argument('--memory', type=float, help='Memory in MB each isolated player may use')
+
+
+def parse_cpus(text):
+    """Parses a list of CPU indexes and ranges, eg, '0-3,6'.
+
+    :returns set: CPU indexes
+    :raises ValueError: if text is not a list of CPU indexes and ranges
+    """
+    cpus = set()
+    for part in text.split(','):
+        first, _, last = part.partition('-')
+        cpus.update(range(int(first), int(last or first) + 1))
+    if not cpus:
+        raise ValueError('No CPUs in {}'.format(text))
+    return cpus
+
+
+def isolation_settings(args):
+    """Gets the IsolatedPlayer keyword arguments from the command line arguments, or None if players are not isolated.
+
+    The limits imply --isolate.
+    """
+    if not (args.isolate or args.cpu_time or args.memory):
+        return None
+    return {'cpu_time_limit': args.cpu_time, 'memory_limit_mb': args.memory}
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Headless match runner for AI vs AI evaluation')
+    parser.add_argument('player1', help='Class of the first player, eg, players.simple_ai.SimpleAI')
+    parser.add_argument('player2', help='Class of the second player')
+    parser.add_argument('--size', type=int, default=8, help='Board size (default: 8)')
+    parser.add_argument('--time', type=float, default=1, help='Time limit per move in seconds (default: 1)')
+    parser.add_argument('--games', type=int, default=2, help='Number of games to play (default: 2)')
+    parser.add_argument('--workers', type=int, help='Number of worker processes (default: number of CPUs)')
+    parser.add_argument('--output', help='File to append the result of each game to, one JSON object per line')
+    add_isolation_arguments(parser)
+    args = parser.parse_args()
+    player1, player2 = load_player(args.player1), load_player(args.player2)
+
+    output = open(args.output, 'a') if args.output else None
+    scores = []
+    try:
+        for result in run_match(player1, player2, args.size, args.time, args.games, args.workers,
+                                isolation_settings(args), args.cpus):
+            scores.append(player1_score(result))
+            print('[+] Game {}: {} (w) vs {} (b), {} in {} plies by {}, {:.3f}s average think time'.format(
+                result.game, result.white, result.black, 'draw' if result.winner == 'd' else result.winner + ' wins',
+                result.plies, result.termination, sum(result.think_times) / max(result.plies, 1)))
+            if output is not None:
+                output.write(json.dumps(result._asdict()) + '\n')
+                output.flush()
+    finally:
+        if output is not None:
+            output.close()
+    wins, draws = scores.count(1), scores.count(0.5)
+    print('[+] {} +{} -{} ={} against {}, score {:.1f}%'.format(
+        args.player1, wins, len(scores) - wins - draws, draws, args.player2,
+        100 * sum(scores) / len(scores) if scores else 0))
+
+
+if __name__ == '__main__':
+    main()
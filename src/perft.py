@@ -0,0 +1,240 @@
+"""
+perft.py
+    - Move generation benchmark and correctness suite.
+
+Perft counts the leaf nodes of the game tree to a fixed depth. The counts depend on every detail of the move rules
+(forced capture, partial and multiple jumps, promotion in the middle of a jump), so comparing them against known
+reference counts, and comparing the moves of two engines position by position, proves an engine generates exactly the
+same moves as CheckerBoard. The game end rules are not applied: every position is expanded to the full depth.
+
+Usage:
+    python perft.py                     Check every engine against the reference counts and report nodes/sec
+    python perft.py --engine bitboard   Check a single engine
+    python perft.py --verify            Also compare the moves of each engine against CheckerBoard at every node
+    python perft.py --size 10 --depth 6 Count the starting position of one board size to a given depth
+"""
+import argparse
+import sys
+import time
+
+from board import CheckerBoard
+from bitboard import BitboardCheckerBoard
+try:
+    from batch_board import BatchCheckerBoard, np
+except ImportError:
+    np = None
+
+
+# Perft counts from the starting position, indexed by board size. Element i is the count for depth i + 1. The counts to
+# depth 6 (depth 3 for 12x12) match the original list of lists implementation of CheckerBoard.
+START_COUNTS = {
+    4: [3, 9, 12, 16, 22, 26, 40, 59],
+    6: [5, 25, 106, 369, 1273, 4258, 13177],
+    8: [7, 49, 302, 1469, 7361, 37205, 182906],
+    10: [9, 81, 658, 4265, 26875, 165609],
+    12: [11, 121, 1222, 10053, 78629],
+}
+
+# Positions exercising multiple jumps, kings and promotion in the middle of a jump. Each position is written as the
+# player to move followed by the rows of the board, separated by '/'. Each row lists only the playable squares, with
+# '.' for an empty square. Each entry is (position, counts), where element i of counts is the count for depth i + 1.
+# The counts to depth 4 match the original list of lists implementation of CheckerBoard.
+CORPUS = [
+    ('w ww./w.w/b.b/w../bbb/..b', [4, 12, 38, 103, 351, 1033]),
+    ('b w.B/.wW/..b/.../..w/...', [3, 8, 19, 58, 173, 588]),
+    ('w wwww/w.w./..ww/wwwb/..../bb.b/bb.b/bbbb', [3, 16, 103, 471, 2292, 10686]),
+    ('w w.../..../w.../..w./b.../..w./bb../b.b.', [3, 14, 60, 198, 1079, 3436]),
+    ('w ..../w..w/..Bw/w.../..bb/.b../W.../b...', [3, 5, 19, 56, 254, 916]),
+    ('w .www/.ww./..ww/..ww/..bb/W.b./.bbb/...b', [3, 10, 55, 214, 1364, 4696]),
+    ('w w.www/w.w../wwww./.bwww/.w.b./...../..bwb/b..../bbbbb/bbb..', [6, 21, 52, 415, 3793]),
+    ('w .w.../wwww./w..../...w./w..../W..../..b.b/w..w./bb..b/....b', [3, 15, 112, 515, 4810]),
+    ('w w..www/.....w/..w..w/ww..../...b.w/..b.../...wb./b...../b...../.b..../bbb.../...W..',
+     [4, 29, 147, 1085, 9208]),
+]
+
+
+def parse_position(position):
+    """Parses a position written in the CORPUS format.
+
+    :param position: Position string
+    :returns tuple: Rows in the format returned by indexing a board, and the player to move
+    """
+    current_player, rows = position.split(' ')
+    rows = rows.split('/')
+    board = []
+    for ix, row in enumerate(rows):
+        squares = iter(row)
+        board.append([])
+        for iy in range(len(rows)):
+            if (ix + iy) % 2 == 0:
+                board[ix].append('_')
+            else:
+                square = next(squares)
+                board[ix].append(0 if square == '.' else square)
+    return board, current_player
+
+
+def perft(board, depth):
+    """Counts the leaf nodes to depth using make_move/unmake_move.
+
+    :param board: Board to count from, eg, a CheckerBoard or BitboardCheckerBoard. It is restored before returning.
+    :param depth: Number of plies to search
+    :returns int: Number of leaf nodes
+    """
+    if depth == 0:
+        return 1
+    moves = board.legal_moves()
+    if depth == 1:
+        return len(moves)
+    count = 0
+    for move in moves:
+        token = board.make_move(move)
+        count += perft(board, depth - 1)
+        board.unmake_move(token)
+    return count
+
+
+def perft_batch(board, depth):
+    """Counts the leaf nodes to depth by expanding a whole ply at a time with BatchCheckerBoard.
+
+    :param board: CheckerBoard to count from
+    :param depth: Number of plies to search
+    :returns int: Number of leaf nodes
+    """
+    batch = BatchCheckerBoard.from_boards([board])
+    for _ in range(depth):
+        _, batch = batch.expand()
+    return len(batch)
+
+
+def verify(board, depth, engine):
+    """Checks that an engine generates exactly the same moves as CheckerBoard at every node to depth.
+
+    The incremental evaluation terms of CheckerBoard are also checked against a full recomputation at every node.
+
+    :param board: CheckerBoard to start from. It is restored before returning.
+    :param depth: Number of plies to search
+    :param engine: Name of the engine to check, a key of ENGINES
+    :returns list: Descriptions of the positions where the moves differ, empty if the engine is correct
+    """
+    errors = []
+    if engine == 'batch':
+        boards = [board]
+        batch = BatchCheckerBoard.from_boards(boards)
+        for ply in range(depth):
+            batch_moves = batch.legal_moves()
+            for node, moves in zip(boards, batch_moves):
+                try:
+                    node.check_evaluation_terms()
+                except AssertionError as e:
+                    errors.append('ply {}: {}'.format(ply, e))
+                if moves != node.legal_moves():
+                    errors.append('ply {}: {} != {}'.format(ply, moves, node.legal_moves()))
+            children = []
+            for node in boards:
+                for move in node.legal_moves():
+                    child = node.clone()
+                    child.make_move(move)
+                    children.append(child)
+            boards = children
+            _, batch = batch.expand()
+        return errors
+
+    other = ENGINES[engine][1](list(board), board.current_player)
+
+    def walk(ply):
+        try:
+            board.check_evaluation_terms()
+        except AssertionError as e:
+            errors.append('ply {}: {}'.format(ply, e))
+        moves = board.legal_moves()
+        if sorted(moves) != sorted(other.legal_moves()):
+            errors.append('ply {}: {} != {}'.format(ply, other.legal_moves(), moves))
+            return
+        if ply == depth:
+            return
+        for move in moves:
+            token = board.make_move(move)
+            other_token = other.make_move(move)
+            walk(ply + 1)
+            other.unmake_move(other_token)
+            board.unmake_move(token)
+
+    walk(0)
+    return errors
+
+
+# Engines which can be checked, as (counting function, board loader) pairs
+ENGINES = {
+    'checkerboard': (perft, CheckerBoard.from_rows),
+    'bitboard': (perft, BitboardCheckerBoard.from_rows),
+}
+if np is not None:
+    ENGINES['batch'] = (perft_batch, CheckerBoard.from_rows)
+
+
+def run_suite(engines, max_depth, check_moves):
+    """Runs the reference counts for each engine and prints the results.
+
+    :param engines: Names of the engines to run
+    :param max_depth: Deepest depth to count
+    :param check_moves: Whether to also compare every node against CheckerBoard with verify
+    :returns bool: true if every count and comparison matched
+    """
+    cases = [('start {}x{}'.format(size, size), CheckerBoard(size), counts)
+             for size, counts in sorted(START_COUNTS.items())]
+    cases += [('corpus {}'.format(i), CheckerBoard.from_rows(*parse_position(position)), counts)
+              for i, (position, counts) in enumerate(CORPUS)]
+    success = True
+    for engine in engines:
+        count_moves, load = ENGINES[engine]
+        nodes = 0
+        elapsed = 0
+        for name, board, counts in cases:
+            depth = min(max_depth, len(counts))
+            start = time.perf_counter()
+            count = count_moves(board if engine == 'batch' else load(list(board), board.current_player), depth)
+            elapsed += time.perf_counter() - start
+            nodes += count
+            if count != counts[depth - 1]:
+                success = False
+                print('[!] {} {} depth {}: {} nodes, expected {}'.format(engine, name, depth, count, counts[depth - 1]))
+            if check_moves and engine != 'checkerboard':
+                errors = verify(board, depth - 1, engine)
+                if errors:
+                    success = False
+                    print('[!] {} {}: moves differ from CheckerBoard at {} positions, eg, {}'
+                          .format(engine, name, len(errors), errors[0]))
+        print('[+] {:<12} {:>9} nodes in {:7.3f}s, {:>10.0f} nodes/sec'.format(engine, nodes, elapsed,
+                                                                             nodes / elapsed if elapsed else 0))
+    return success
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Perft move generation benchmark and correctness suite')
+    parser.add_argument('--engine', choices=sorted(ENGINES), action='append',
+                        help='Engine to run, may be repeated (default: all)')
+    parser.add_argument('--depth', type=int, default=5, help='Deepest depth to count (default: 5)')
+    parser.add_argument('--size', type=int, help='Only count the starting position of this board size')
+    parser.add_argument('--verify', action='store_true', help='Compare the moves of each engine at every node')
+    args = parser.parse_args()
+    engines = args.engine or sorted(ENGINES)
+
+    if args.size is not None:
+        for engine in engines:
+            count_moves, load = ENGINES[engine]
+            board = CheckerBoard(args.size)
+            start = time.perf_counter()
+            count = count_moves(board if engine == 'batch' else load(list(board)), args.depth)
+            elapsed = time.perf_counter() - start
+            print('[+] {:<12} perft({}) = {} in {:.3f}s, {:.0f} nodes/sec'.format(engine, args.depth, count, elapsed,
+                                                                                count / elapsed if elapsed else 0))
+        return
+
+    if not run_suite(engines, args.depth, args.verify):
+        sys.exit(1)
+    print('[+] All counts match')
+
+
+if __name__ == '__main__':
+    main()
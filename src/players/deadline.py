@@ -0,0 +1,104 @@
+"""
+deadline.py
+    - Cooperative cancellation of player moves.
+
+A Deadline is passed to the move method of players which accept it. The player searches until the deadline is
+cancelled or its time runs out, publishing each improving move to ret_val with publish_move so the runner can take the
+latest move at any time. run_move runs a move on a thread, cancels the deadline when the time limit expires and checks
+that the player really stopped, so a slow player does not keep using CPU during its opponent's turn.
+"""
+import inspect
+import time
+from threading import Event, Thread
+
+# Seconds a player which accepts a deadline is given to stop after it is cancelled
+STOP_GRACE = 0.5
+
+
+class Deadline:
+    """Time limit and stop signal of a move.
+
+    A Deadline can be used wherever a threading.Event stop signal is expected: is_set returns true once the deadline is
+    cancelled or its time has run out.
+    """
+    def __init__(self, time_limit):
+        """Inits a Deadline with the specified parameters.
+
+        :param time_limit: Time in seconds from now until the deadline
+        """
+        self.end_time = time.monotonic() + time_limit
+        self._cancelled = Event()
+
+    def cancel(self):
+        """Signals the player to stop as soon as possible. Safe to call from any thread."""
+        self._cancelled.set()
+
+    def cancelled(self):
+        """Returns whether the deadline was cancelled, regardless of the time left."""
+        return self._cancelled.is_set()
+
+    def is_set(self):
+        """Returns whether the player should stop, ie, the deadline was cancelled or its time has run out."""
+        return self._cancelled.is_set() or time.monotonic() >= self.end_time
+
+    def remaining(self):
+        """Returns the time left in seconds, 0 once cancelled or expired."""
+        return 0 if self._cancelled.is_set() else max(0, self.end_time - time.monotonic())
+
+    def wait(self, timeout=None):
+        """Waits until the deadline is cancelled or its time runs out, or timeout seconds have passed.
+
+        :returns bool: true if the player should stop
+        """
+        remaining = self.remaining()
+        self._cancelled.wait(remaining if timeout is None else min(timeout, remaining))
+        return self.is_set()
+
+
+def publish_move(ret_val, move):
+    """Publishes a move to ret_val, replacing any move published before.
+
+    The contents are replaced in a single operation, so a runner reading ret_val from another thread sees either the
+    previous move or the new one, never a mix of both.
+
+    :param ret_val: List the move is returned in
+    :param move: Move, as a list of location tuples
+    """
+    ret_val[:] = list(move)
+
+
+def accepts_deadline(player):
+    """Returns whether a player's move method accepts a deadline argument."""
+    try:
+        return 'deadline' in inspect.signature(player.move).parameters
+    except (TypeError, ValueError):
+        return False
+
+
+def run_move(player, board, time_limit, grace=STOP_GRACE):
+    """Runs a player's move on a separate thread and returns the latest move it published.
+
+    When the time limit expires the deadline is cancelled. Players which accept a deadline are then given grace seconds
+    to stop, and a warning is printed if the thread is still running afterwards. Players which do not accept a deadline
+    can not be stopped and are left running, as before.
+
+    :param player: AbstractPlayer to move
+    :param board: Board to pass to the player, eg, a clone of the game board
+    :param time_limit: Time in seconds the player has to move
+    :param grace: Time in seconds a player which accepts a deadline has to stop after it is cancelled
+    :returns list: Copy of ret_val when the player returned or its time ran out
+    """
+    ret_val = []  # list representing move returned from player
+    deadline = Deadline(time_limit)
+    kwargs = {'deadline': deadline} if accepts_deadline(player) else {}
+    t = Thread(target=player.move, args=(board, time_limit, ret_val), kwargs=kwargs, daemon=True)
+    t.start()
+    t.join(time_limit)
+    deadline.cancel()
+    # Moves published after the deadline do not count
+    move = list(ret_val)
+    if t.is_alive() and kwargs:
+        t.join(grace)
+        if t.is_alive():
+            print('[!] Player {} did not stop within {}s of its deadline'.format(player.get_name(), grace))
+    return move
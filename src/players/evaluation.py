@@ -0,0 +1,124 @@
+"""
+evaluation.py
+    - Batched, vectorized position evaluation using NumPy.
+
+Positions are evaluated in batches as an (N, squares) int8 array, using the packed layout returned by
+CheckerBoard.get_squares: one signed byte per playable square, row by row, with 1/2 for a white pawn/king, -1/-2 for a
+black pawn/king and 0 for an empty square.
+
+NumPy is optional. If it is not installed, numpy_available() returns False and callers should fall back to scoring
+positions one at a time.
+"""
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+
+# Weights equivalent to ProcessingNode's per-leaf material count: 1 per pawn and 3 per king
+MATERIAL_WEIGHTS = {'man': 1.0, 'king': 3.0, 'advancement': 0.0, 'back_rank': 0.0, 'mobility': 0.0}
+
+# Weights including the positional terms, intended as a starting point for analysis
+DEFAULT_WEIGHTS = {'man': 1.0, 'king': 3.0, 'advancement': 0.05, 'back_rank': 0.1, 'mobility': 0.02}
+
+
+def numpy_available():
+    """Returns whether NumPy is installed, ie, whether BatchEvaluator can be used."""
+    return np is not None
+
+
+class BatchEvaluator:
+    """Scores many positions at once with vectorized NumPy operations.
+
+    Each position is scored as the difference between the two players of the weighted sum of:
+        - man: number of pawns
+        - king: number of kings
+        - advancement: number of rows each pawn has advanced from its own back rank
+        - back_rank: number of pawns still guarding the back rank
+        - mobility: number of diagonal steps onto an empty square (forward for pawns, any direction for kings)
+    """
+    def __init__(self, board_size, weights=None):
+        """Inits a BatchEvaluator with the specified parameters.
+
+        :param board_size: Size of the boards which will be evaluated
+        :param weights: Dictionary of weights for the terms above. Missing terms default to DEFAULT_WEIGHTS.
+        :raises ImportError: if NumPy is not installed
+        """
+        if np is None:
+            raise ImportError('BatchEvaluator requires numpy')
+        self._board_size = board_size
+        self._weights = dict(DEFAULT_WEIGHTS)
+        if weights is not None:
+            self._weights.update(weights)
+
+        half = board_size // 2
+        self._num_squares = board_size * half
+        rows = np.arange(self._num_squares) // half
+        cols = 2 * (np.arange(self._num_squares) % half) + (rows + 1) % 2
+        self._white_advancement = rows
+        self._black_advancement = board_size - 1 - rows
+        self._white_back_rank = rows == 0
+        self._black_back_rank = rows == board_size - 1
+
+        # Neighbour square indexes per direction, white forward directions first. Off board neighbours point at an
+        # extra padding square which is never empty.
+        neighbours = np.full((self._num_squares, 4), self._num_squares, dtype=np.intp)
+        for direction, (row_step, col_step) in enumerate(((1, -1), (1, 1), (-1, -1), (-1, 1))):
+            x, y = rows + row_step, cols + col_step
+            on_board = (x >= 0) & (x < board_size) & (y >= 0) & (y < board_size)
+            neighbours[on_board, direction] = x[on_board] * half + y[on_board] // 2
+        self._neighbours = neighbours
+
+    def evaluate(self, positions, player):
+        """Scores a batch of positions.
+
+        :param positions: Array-like of shape (N, squares) with the packed positions, eg, from stack_positions
+        :param player: Player whose point of view utilities are calculated from. 'w' for white, 'b' for black.
+        :returns numpy.ndarray: Array of N utilities, higher is better for player
+        """
+        positions = np.asarray(positions, dtype=np.int8).reshape(-1, self._num_squares)
+        white_men = positions == 1
+        white_kings = positions == 2
+        black_men = positions == -1
+        black_kings = positions == -2
+        weights = self._weights
+
+        score = weights['man'] * (white_men.sum(axis=1) - black_men.sum(axis=1)).astype(np.float64)
+        score += weights['king'] * (white_kings.sum(axis=1) - black_kings.sum(axis=1))
+        if weights['advancement']:
+            score += weights['advancement'] * (white_men @ self._white_advancement -
+                                               black_men @ self._black_advancement)
+        if weights['back_rank']:
+            score += weights['back_rank'] * ((white_men & self._white_back_rank).sum(axis=1) -
+                                             (black_men & self._black_back_rank).sum(axis=1))
+        if weights['mobility']:
+            padded = np.concatenate([positions, np.ones((len(positions), 1), dtype=np.int8)], axis=1)
+            empty = padded[:, self._neighbours] == 0  # (N, squares, 4)
+            white_mobility = ((white_men | white_kings)[:, :, None] & empty[:, :, :2]).sum(axis=(1, 2))
+            white_mobility += (white_kings[:, :, None] & empty[:, :, 2:]).sum(axis=(1, 2))
+            black_mobility = ((black_men | black_kings)[:, :, None] & empty[:, :, 2:]).sum(axis=(1, 2))
+            black_mobility += (black_kings[:, :, None] & empty[:, :, :2]).sum(axis=(1, 2))
+            score += weights['mobility'] * (white_mobility - black_mobility)
+        return score if player == 'w' else -score
+
+    def evaluate_boards(self, boards, player):
+        """Scores a list of boards.
+
+        :param boards: List of CheckerBoard instances
+        :param player: Player whose point of view utilities are calculated from. 'w' for white, 'b' for black.
+        :returns numpy.ndarray: Array of utilities, one per board
+        """
+        return self.evaluate(stack_positions(boards, self._num_squares), player)
+
+
+def stack_positions(boards, num_squares=None):
+    """Stacks the packed positions of boards into an (N, squares) int8 array.
+
+    :param boards: List of CheckerBoard instances
+    :param num_squares: Number of squares per position, only needed when boards is empty
+    :returns numpy.ndarray: Array of packed positions
+    """
+    data = b''.join([board.get_squares() for board in boards])
+    if num_squares is None:
+        num_squares = len(data) // len(boards)
+    return np.frombuffer(data, dtype=np.int8).reshape(-1, num_squares)
@@ -10,8 +10,39 @@ class AbstractPlayer:
 
     @abc.abstractmethod
     def move(self, board, time_limit, ret_val):
+        """Chooses a move, returning it in ret_val.
+
+        Players may also accept a deadline keyword argument, a players.deadline.Deadline which is cancelled when the
+        time limit expires. Such players should publish each improving move with players.deadline.publish_move as they
+        search and return soon after the deadline is set, so they do not use CPU during the opponent's turn.
+
+        :param board: CheckerBoard to move on, a copy of the game board
+        :param time_limit: Time in seconds the player has to move
+        :param ret_val: List the move is returned in, as a list of location tuples
+        """
         raise NotImplementedError("Derived class must implement move")
 
     @abc.abstractmethod
     def get_name(self):
         raise NotImplementedError("Derived class must implement name")
+
+    def predict_reply(self, board):
+        """Predicts the opponent's reply, so the position after it can be searched on the opponent's time.
+
+        Players which do not ponder do not need to override this.
+
+        :param board: CheckerBoard with the opponent to move
+        :returns list: Predicted move of the opponent, or None to not ponder
+        """
+        return None
+
+    def ponder(self, board, stop):
+        """Searches on the opponent's time, so the work can be reused by the next call to move.
+
+        This is called on a separate thread with the position after the predicted reply, and must return soon after
+        stop is set. Players which do not ponder do not need to override this.
+
+        :param board: CheckerBoard after the predicted reply, with this player to move
+        :param stop: threading.Event which is set when the opponent's move arrives
+        """
+        pass
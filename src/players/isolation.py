@@ -0,0 +1,293 @@
+"""
+isolation.py
+    - Process-isolated player execution.
+
+An IsolatedPlayer runs a player in its own long-lived subprocess, so a slow or misbehaving player neither shares the
+GIL with the referee or its opponent nor keeps running after its deadline. Each move request (the pickled board and the
+time limit) is sent to the subprocess over a pipe, and each move the player publishes is sent back over another one.
+
+The subprocess runs the move like run_move: it cancels the player's deadline when the time runs out, or when the
+referee sends it SIGUSR1 because the runner's deadline was cancelled. A player which accepts a deadline has STOP_GRACE
+seconds to stop, as under run_move. If the subprocess has not replied kill_grace seconds after the deadline, or its
+player did not stop, the subprocess is killed; the moves it forwarded before then still count. A killed subprocess is
+started again, with a new player, at the next move, within that move's time.
+
+The subprocess can be pinned to a set of CPUs and given RLIMIT_CPU and RLIMIT_AS limits. A player which exceeds them is
+terminated by the operating system and makes no further moves.
+
+Only POSIX systems are supported.
+"""
+import importlib
+import os
+import pickle
+import select
+import signal
+import struct
+import subprocess
+import sys
+import time
+from threading import Thread
+
+from .interface import AbstractPlayer
+from .deadline import STOP_GRACE, Deadline, accepts_deadline, publish_move
+
+try:
+    import resource
+except ImportError:
+    resource = None
+
+# Seconds the subprocess has to reply after the deadline before it is killed. It covers the STOP_GRACE a player which
+# accepts a deadline has to stop, as under run_move, and the time the reply takes to reach the referee.
+KILL_GRACE = STOP_GRACE + 0.25
+
+# Seconds the player has to be created when an IsolatedPlayer is created
+START_TIMEOUT = 10
+
+# Seconds between checks for the reply and the runner's deadline
+_POLL_INTERVAL = 0.01
+
+# Seconds of kill_grace left for the reply to reach the referee after the player's stop grace
+_REPLY_MARGIN = 0.1
+
+# Messages are pickled and sent with their length first
+_HEADER = struct.Struct('!Q')
+
+
+def _send(fd, message):
+    """Sends a message over a pipe."""
+    data = pickle.dumps(message)
+    data = _HEADER.pack(len(data)) + data
+    while data:
+        data = data[os.write(fd, data):]
+
+
+def _recv(fd):
+    """Receives a message from a pipe.
+
+    :raises EOFError: if the pipe is closed before a whole message is received
+    """
+    header = _read_exactly(fd, _HEADER.size)
+    return pickle.loads(_read_exactly(fd, _HEADER.unpack(header)[0]))
+
+
+def _read_exactly(fd, size):
+    data = b''
+    while len(data) < size:
+        chunk = os.read(fd, size - len(data))
+        if not chunk:
+            raise EOFError('Pipe closed')
+        data += chunk
+    return data
+
+
+class IsolatedPlayer(AbstractPlayer):
+    """A player run in its own subprocess, with its deadline enforced by the referee."""
+    def __init__(self, player_class, board_size, player_num, cpus=None, cpu_time_limit=None, memory_limit_mb=None,
+                 kill_grace=KILL_GRACE, start_timeout=START_TIMEOUT):
+        """Inits an IsolatedPlayer, starting the subprocess and creating the player in it.
+
+        :param player_class: Class of the player. It must be importable from its module, ie, defined at module level.
+        :param board_size: Size of the square board to be used
+        :param player_num: 1 or 'w' for white, 2 or 'b' for black
+        :param cpus: Set of CPU indexes the subprocess may run on, or None for any
+        :param cpu_time_limit: CPU seconds the subprocess may use in total (RLIMIT_CPU), or None for no limit
+        :param memory_limit_mb: Address space in MB the subprocess may use (RLIMIT_AS), or None for no limit
+        :param kill_grace: Time in seconds the subprocess has to reply after the deadline before it is killed. A player
+        which accepts a deadline has up to STOP_GRACE of it to stop.
+        :param start_timeout: Time in seconds the player has to be created
+        :raises RuntimeError: if the player could not be created in the subprocess within start_timeout
+        """
+        stop_grace = max(0, min(STOP_GRACE, kill_grace - _REPLY_MARGIN))
+        self._settings = (list(sys.path), player_class.__module__, player_class.__qualname__, board_size, player_num,
+                          cpus, cpu_time_limit, memory_limit_mb, stop_grace)
+        self.kill_grace = kill_grace
+        self._process = None
+        self._requests = self._replies = None
+        self._failed = False  # Whether the subprocess exited by itself, eg, it exceeded a limit
+        self._name = player_class.__name__
+        if not self._start(start_timeout):
+            raise RuntimeError('Player {} could not be started'.format(self._name))
+
+    def _start(self, timeout):
+        """Starts the subprocess and waits until the player is created.
+
+        :param timeout: Time in seconds the player has to be created
+        :returns bool: true if the player is ready. Otherwise the subprocess is killed and the player makes no further
+        moves.
+        """
+        request_read, request_write = os.pipe()
+        reply_read, reply_write = os.pipe()
+        env = dict(os.environ)
+        # The subprocess imports this module as players.isolation, and the player's module from the same sys.path
+        src = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+        env['PYTHONPATH'] = os.pathsep.join([src] + ([env['PYTHONPATH']] if env.get('PYTHONPATH') else []))
+        self._process = subprocess.Popen([sys.executable, '-m', 'players.isolation', str(request_read),
+                                          str(reply_write)], pass_fds=(request_read, reply_write), env=env)
+        os.close(request_read)
+        os.close(reply_write)
+        self._requests, self._replies = request_write, reply_read
+        try:
+            _send(self._requests, self._settings)
+            ready = select.select([self._replies], [], [], max(0, timeout))[0]
+            reply = _recv(self._replies) if ready else None
+        except (EOFError, OSError):
+            reply = None
+        if reply is None:
+            self._failed = True
+            self._stop_process()
+            return False
+        self._name = reply[1]
+        return True
+
+    def move(self, board, time_limit, ret_val, deadline=None):
+        start = time.monotonic()
+        if self._process is None and not self._failed:
+            # The subprocess was killed during an earlier move. Starting it again counts against the time of this move.
+            if not self._start(time_limit):
+                print('[!] Player {} could not be restarted and will make no further moves'.format(self._name))
+        if self._process is None:
+            return ret_val
+        try:
+            _send(self._requests, ('move', board, max(0, start + time_limit - time.monotonic())))
+        except OSError:
+            self._exited()
+            return ret_val
+
+        stop_time = None  # When the subprocess was asked to stop
+        while True:
+            now = time.monotonic()
+            if stop_time is None and (now >= start + time_limit or (deadline is not None and deadline.cancelled())):
+                stop_time = now
+                self._signal(signal.SIGUSR1)
+            if stop_time is not None and now >= stop_time + self.kill_grace:
+                print('[!] Player {} did not reply within {}s of its deadline and was killed'.format(
+                    self._name, self.kill_grace))
+                self._stop_process()
+                return ret_val
+            if not select.select([self._replies], [], [], _POLL_INTERVAL)[0]:
+                continue
+            try:
+                reply = _recv(self._replies)
+            except EOFError:
+                self._exited()
+                return ret_val
+            if len(reply[1]):
+                publish_move(ret_val, reply[1])
+            if reply[0] == 'move':
+                break
+
+        if not reply[2]:
+            # The player is still running, so it would use CPU during the opponent's turn
+            print('[!] Player {} did not stop at its deadline and was killed'.format(self._name))
+            self._stop_process()
+        return ret_val
+
+    def _signal(self, signum):
+        try:
+            self._process.send_signal(signum)
+        except OSError:
+            pass
+
+    def _exited(self):
+        """Handles a subprocess which exited by itself. The player makes no further moves."""
+        code = self._process.wait()
+        print('[!] Player {} exited with code {} and will make no further moves'.format(self._name, code))
+        self._failed = True
+        self._stop_process()
+
+    def _stop_process(self):
+        """Kills the subprocess, if running, and closes the pipes."""
+        if self._process is None:
+            return
+        if self._process.poll() is None:
+            self._process.kill()
+        self._process.wait()
+        for fd in (self._requests, self._replies):
+            try:
+                os.close(fd)
+            except OSError:
+                pass
+        self._process = None
+
+    def close(self):
+        """Stops the subprocess. The player should not be used afterwards."""
+        if self._process is not None:
+            try:
+                _send(self._requests, ('close',))
+                self._process.wait(self.kill_grace)
+            except (OSError, subprocess.TimeoutExpired):
+                pass
+        self._stop_process()
+        self._failed = True
+
+    def get_name(self):
+        return self._name
+
+
+def _apply_limits(cpus, cpu_time_limit, memory_limit_mb):
+    """Pins this process to cpus and sets its resource limits, where supported."""
+    if cpus is not None and hasattr(os, 'sched_setaffinity'):
+        os.sched_setaffinity(0, cpus)
+    if resource is not None:
+        if cpu_time_limit is not None:
+            seconds = max(1, int(cpu_time_limit))
+            resource.setrlimit(resource.RLIMIT_CPU, (seconds, seconds + 1))
+        if memory_limit_mb is not None:
+            size = int(memory_limit_mb * 1024 * 1024)
+            resource.setrlimit(resource.RLIMIT_AS, (size, size))
+
+
+def _serve(request_fd, reply_fd):
+    """Runs a player in this subprocess, answering move requests until the pipe is closed or it is asked to close."""
+    settings = _recv(request_fd)
+    path, module, qualname, board_size, player_num, cpus, cpu_time_limit, memory_limit_mb, stop_grace = settings
+    sys.path[:] = path
+    _apply_limits(cpus, cpu_time_limit, memory_limit_mb)
+    player_class = importlib.import_module(module)
+    for name in qualname.split('.'):
+        player_class = getattr(player_class, name)
+    player = player_class(board_size, player_num)
+    use_deadline = accepts_deadline(player)
+
+    # The referee sends SIGUSR1 to stop the current move early
+    current = [None]
+
+    def stop(signum, frame):
+        if current[0] is not None:
+            current[0].cancel()
+
+    signal.signal(signal.SIGUSR1, stop)
+    _send(reply_fd, ('ready', player.get_name()))
+
+    while True:
+        try:
+            request = _recv(request_fd)
+        except EOFError:
+            return
+        if request[0] == 'close':
+            return
+        _, board, time_limit = request
+        ret_val = []
+        deadline = current[0] = Deadline(time_limit)
+        kwargs = {'deadline': deadline} if use_deadline else {}
+        t = Thread(target=player.move, args=(board, time_limit, ret_val), kwargs=kwargs, daemon=True)
+        t.start()
+        # Joined in short steps, so a stop signal is noticed promptly and each move published to ret_val is forwarded
+        # to the referee straight away
+        published = []
+        while t.is_alive() and not deadline.is_set():
+            t.join(_POLL_INTERVAL)
+            if ret_val != published:
+                published = list(ret_val)
+                _send(reply_fd, ('progress', published))
+        deadline.cancel()
+        # Moves published after the deadline do not count
+        move = list(ret_val)
+        if t.is_alive() and use_deadline:
+            t.join(stop_grace)
+        current[0] = None
+        _send(reply_fd, ('move', move, not t.is_alive()))
+
+
+if __name__ == '__main__':
+    _serve(int(sys.argv[1]), int(sys.argv[2]))
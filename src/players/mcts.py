@@ -0,0 +1,236 @@
+"""
+mcts.py
+    - Monte Carlo Tree Search player.
+
+The player builds a search tree with UCT: the tree is descended by picking the child with the best upper confidence
+bound, a new child is added, and the position is scored by a random playout to the end of the game. Playouts are run
+in batches with BatchCheckerBoard, which advances all the games of a batch at once, so NumPy is strongly recommended.
+Without it the playouts are run one at a time on CheckerBoard copies.
+
+The tree is kept between moves: at the start of a move the subtree of the position reached is reused as the new root.
+"""
+import math
+import random
+import time
+
+from .interface import AbstractPlayer
+from .deadline import publish_move
+from batch_board import BatchCheckerBoard, np
+
+
+class MCTSPlayer(AbstractPlayer):
+    def __init__(self, board_size, player_num, batch_size=64, exploration=1.4, max_playout_plies=150, verbose=False):
+        """Inits an MCTSPlayer with the specified parameters.
+
+        :param board_size: Size of the square board to be used
+        :param player_num: 1 or 'w' for white, 2 or 'b' for black
+        :param batch_size: Number of playouts run together in each batch
+        :param exploration: Exploration constant of the UCT formula
+        :param max_playout_plies: Playouts still running after this many plies are scored by material
+        :param verbose: Whether to print the number of simulations per second after each move
+        :raises ValueError: if player_num is not an int or a string
+        """
+        if isinstance(player_num, int):
+            self._player = 'w' if player_num == 1 else 'b'
+        elif isinstance(player_num, str):
+            self._player = player_num
+        else:
+            raise ValueError("player_num must be either an int or a string.")
+        self._batch_size = batch_size
+        self._exploration = exploration
+        self._max_playout_plies = max_playout_plies
+        self._verbose = verbose
+        self._rng = np.random.default_rng() if np is not None else None
+        self._root = None  # Root MCTSNode of the tree kept between moves
+        self._root_board = None  # Position of the root
+        self.simulations = 0  # Number of playouts run in the last move
+        self.simulations_per_second = 0.0  # Playouts per second in the last move
+        self.reused_visits = 0  # Visits of the subtree reused at the start of the last move
+
+    def move(self, board, time_limit, ret_val, deadline=None):
+        start_time = time.monotonic()
+        end_time = start_time + 0.85 * time_limit  # Only use a portion of allotted to account for overhead
+        moves = board.legal_moves()
+        publish_move(ret_val, moves[0])
+        if len(moves) == 1:
+            return ret_val
+
+        root = self._reuse_tree(board)
+        self.reused_visits = root.visits
+        self.simulations = 0
+        while time.monotonic() < end_time and (deadline is None or not deadline.is_set()):
+            self.simulations += self._run_batch(root, board, end_time, deadline)
+            publish_move(ret_val, root.best_child().move)
+        elapsed = time.monotonic() - start_time
+        self.simulations_per_second = self.simulations / elapsed if elapsed > 0 else 0.0
+        if self._verbose:
+            print('[.] {}: {} simulations in {:.2f}s, {:.0f} simulations/sec'.format(
+                self.get_name(), self.simulations, elapsed, self.simulations_per_second))
+        self._root = root
+        self._root_board = board.clone()
+        return ret_val
+
+    def get_stats(self):
+        """Gets the statistics of the last move.
+
+        :returns dict: Number of simulations, simulations per second and visits reused from the previous tree
+        """
+        return {'simulations': self.simulations, 'simulations_per_second': self.simulations_per_second,
+                'reused_visits': self.reused_visits}
+
+    def get_name(self):
+        return "MCTS"
+
+    def _reuse_tree(self, board):
+        """Finds the subtree of the previous tree for the position on board.
+
+        The previous root was the position before this player's last move, so the position on board is usually a
+        grandchild of it.
+
+        :returns MCTSNode: Root of the tree for board, a new node if the position was not in the previous tree
+        """
+        if self._root is not None:
+            root_board = self._root_board
+            if self._same_position(root_board, board):
+                return self._root
+            for child in self._root.children:
+                token = root_board.make_move(child.move)
+                for grandchild in child.children:
+                    grandchild_token = root_board.make_move(grandchild.move)
+                    found = self._same_position(root_board, board)
+                    root_board.unmake_move(grandchild_token)
+                    if found:
+                        root_board.unmake_move(token)
+                        grandchild.parent = None
+                        return grandchild
+                root_board.unmake_move(token)
+        return MCTSNode(None, None, 'w' if board.current_player == 'b' else 'b')
+
+    @staticmethod
+    def _same_position(board, other):
+        """Returns whether two boards are in the same position with the same player to move."""
+        return board.position_hash == other.position_hash and board.get_squares() == other.get_squares()
+
+    def _run_batch(self, root, board, end_time=None, stop=None):
+        """Selects and expands a batch of leaves, plays them out and backs up the results.
+
+        Each selected path is given a virtual loss, ie, its visits are counted before its result is known, so the
+        leaves of a batch are spread over the tree rather than all being the same leaf.
+
+        :param root: Root MCTSNode
+        :param board: Board in the position of root. It is restored before returning.
+        :param end_time: Value of time.monotonic() at which the playouts are cut short, see _play_out
+        :param stop: threading.Event or Deadline which cuts the playouts short when set
+        :returns int: Number of playouts run
+        """
+        leaves = []
+        positions = []
+        results = []
+        for _ in range(self._batch_size):
+            node = root
+            tokens = []
+            node.visits += 1
+            # Selection: descend through fully expanded nodes
+            while node.untried is not None and len(node.untried) == 0 and len(node.children) > 0:
+                node = node.select_child(self._exploration)
+                tokens.append(board.make_move(node.move))
+                node.visits += 1
+            # Expansion: add one untried move
+            if node.untried is None:
+                node.untried = board.legal_moves()
+                random.shuffle(node.untried)
+            if len(node.untried) > 0:
+                move = node.untried.pop()
+                child = MCTSNode(move, node, board.current_player)
+                node.children.append(child)
+                node = child
+                tokens.append(board.make_move(move))
+                node.visits += 1
+            winner = board.get_winner()
+            if winner is None:
+                leaves.append(node)
+                positions.append(board.clone())
+            else:
+                results.append((node, winner))
+            for token in reversed(tokens):
+                board.unmake_move(token)
+
+        results.extend(zip(leaves, self._play_out(positions, end_time, stop)))
+        for node, winner in results:
+            node.backup(winner)
+        return self._batch_size
+
+    def _play_out(self, boards, end_time=None, stop=None):
+        """Plays every position to the end with uniformly random moves.
+
+        The time is checked after every ply, so a batch of long playouts does not run past the end of the move.
+
+        :param boards: List of CheckerBoard positions, which may be modified
+        :param end_time: Value of time.monotonic() after which no further plies are played, unlimited if None
+        :param stop: threading.Event or Deadline which stops the playouts when set
+        :returns list: Winner of each game, 'w', 'b' or 'd'. Games still running after max_playout_plies, or when the
+        playouts are stopped, are won by the player with more material, counting 3 per king, or drawn if equal.
+        """
+        if len(boards) == 0:
+            return []
+        if np is not None:
+            batch = BatchCheckerBoard.from_boards(boards)
+            winners = batch.play_random(self._max_playout_plies, self._rng, end_time, stop)
+            squares = batch.get_squares().astype(np.int32)
+            material = (np.where(np.abs(squares) == 2, 3 * np.sign(squares), squares)).sum(axis=1).tolist()
+        else:
+            winners = []
+            material = []
+            for board in boards:
+                for _ in range(self._max_playout_plies):
+                    winner = board.get_winner()
+                    if winner is not None or (end_time is not None and time.monotonic() >= end_time) or \
+                            (stop is not None and stop.is_set()):
+                        break
+                    board.make_move(random.choice(board.legal_moves()))
+                winners.append(board.get_winner())
+                material.append(board.evaluation_terms[0] + 3 * board.evaluation_terms[1])
+        return [winner if winner is not None else ('w' if score > 0 else 'b' if score < 0 else 'd')
+                for winner, score in zip(winners, material)]
+
+
+class MCTSNode:
+    """A node of the Monte Carlo search tree."""
+    __slots__ = ('move', 'parent', 'player', 'children', 'untried', 'visits', 'wins')
+
+    def __init__(self, move, parent, player):
+        """Inits an MCTSNode with the specified parameters.
+
+        :param move: Move which resulted in reaching this node, None for the root
+        :param parent: Parent MCTSNode, None for the root
+        :param player: Player who made move. 'w' for white, 'b' for black.
+        """
+        self.move = move
+        self.parent = parent
+        self.player = player
+        self.children = []
+        self.untried = None  # Moves without a child node yet, None until the node is first expanded
+        self.visits = 0
+        self.wins = 0.0  # Playouts won by player, counting draws as half a win
+
+    def select_child(self, exploration):
+        """Selects the child with the highest upper confidence bound (UCT)."""
+        log_visits = math.log(self.visits)
+        return max(self.children, key=lambda c: c.wins / c.visits + exploration * math.sqrt(log_visits / c.visits))
+
+    def best_child(self):
+        """Returns the most visited child, the most reliable choice of move."""
+        return max(self.children, key=lambda c: c.visits)
+
+    def backup(self, winner):
+        """Adds the result of a playout to this node and its ancestors. Visits were already counted on selection.
+
+        :param winner: 'w', 'b' or 'd'
+        """
+        node = self
+        while node is not None:
+            if winner == node.player:
+                node.wins += 1
+            elif winner == 'd':
+                node.wins += 0.5
+            node = node.parent
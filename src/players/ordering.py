@@ -0,0 +1,108 @@
+"""
+ordering.py
+    - Move ordering heuristics for the alpha-beta search.
+
+Alpha-beta prunes the most when the best move is searched first. Moves are ordered by:
+    1. The hash move, ie, the best move stored in the transposition table for the position
+    2. Jumps, longest chain first since it captures the most pieces
+    3. Killer moves, ie, moves which caused a cutoff at the same ply in a sibling position
+    4. The history heuristic, ie, how often and how deep a move from the same square to the same square caused a cutoff
+"""
+
+# Number of killer moves kept per ply
+_KILLERS_PER_PLY = 2
+
+# Sort keys of each class of move, far enough apart that history scores, which are kept below _MAX_HISTORY, never
+# overlap the next class
+_HASH_MOVE = 1 << 60
+_JUMP = 1 << 50
+_JUMP_LENGTH = 1 << 40
+_KILLER = 1 << 30
+
+# History scores are halved whenever one would exceed this
+_MAX_HISTORY = _KILLER - 1
+
+
+class MoveOrdering:
+    """Orders moves for the search and keeps the killer and history tables.
+
+    The tables are kept between searches of the same game, with new_search called before each search so the history
+    scores of earlier moves decay. The first-move cutoff rate, ie, how often the first move searched caused the cutoff,
+    measures how well the moves are ordered.
+    """
+    def __init__(self):
+        """Inits a MoveOrdering."""
+        self._killers = []  # Killer moves per ply, most recent first
+        self._history = {}  # History score per (from location, to location)
+        self.cutoffs = 0  # Number of cutoffs
+        self.first_move_cutoffs = 0  # Number of cutoffs caused by the first move searched
+
+    def new_search(self):
+        """Prepares for a new search: killers are cleared, history scores are halved and the counters are reset."""
+        self._killers = []
+        self._age_history()
+        self.cutoffs = 0
+        self.first_move_cutoffs = 0
+
+    def order(self, moves, ply, hash_move=None):
+        """Orders the moves of a position.
+
+        :param moves: Legal moves of the position
+        :param ply: Distance of the position from the root
+        :param hash_move: Index in moves of the hash move, if any
+        :returns list: Indexes of moves in the order they should be searched
+        """
+        if len(moves) < 2:
+            return list(range(len(moves)))
+        killers = self._killers[ply] if ply < len(self._killers) else ()
+        history = self._history
+        keys = []
+        for i, move in enumerate(moves):
+            if i == hash_move:
+                keys.append(_HASH_MOVE)
+            elif abs(move[1][0] - move[0][0]) == 2:
+                keys.append(_JUMP + len(move) * _JUMP_LENGTH + history.get((move[0], move[-1]), 0))
+            elif move in killers:
+                keys.append(_KILLER * (_KILLERS_PER_PLY - killers.index(move)))
+            else:
+                keys.append(history.get((move[0], move[-1]), 0))
+        return sorted(range(len(moves)), key=keys.__getitem__, reverse=True)
+
+    def record_cutoff(self, move, ply, depth, first):
+        """Records a move which caused a cutoff.
+
+        :param move: Move which caused the cutoff
+        :param ply: Distance of the position from the root
+        :param depth: Remaining depth the position was searched to
+        :param first: Whether the move was the first searched in the position
+        """
+        self.cutoffs += 1
+        if first:
+            self.first_move_cutoffs += 1
+        key = (move[0], move[-1])
+        score = self._history.get(key, 0) + depth * depth
+        self._history[key] = score
+        if score > _MAX_HISTORY:
+            # Halving every score keeps their order while keeping them below the killer moves
+            self._age_history()
+        if abs(move[1][0] - move[0][0]) == 2:
+            # Jumps are already searched first, so they are not kept as killers
+            return
+        while len(self._killers) <= ply:
+            self._killers.append([])
+        killers = self._killers[ply]
+        if move not in killers:
+            killers.insert(0, move)
+            del killers[_KILLERS_PER_PLY:]
+
+    def _age_history(self):
+        """Halves the history scores, forgetting the moves whose score drops to 0."""
+        self._history = {key: score // 2 for key, score in self._history.items() if score > 1}
+
+    def get_stats(self):
+        """Gets the cutoff counters.
+
+        :returns dict: Number of cutoffs, number caused by the first move and the first-move cutoff rate
+        """
+        return {'cutoffs': self.cutoffs, 'first_move_cutoffs': self.first_move_cutoffs,
+                'first_move_rate': self.first_move_cutoffs / self.cutoffs if self.cutoffs else 0.0}
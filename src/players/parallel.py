@@ -0,0 +1,156 @@
+"""
+parallel.py
+    - Parallel alpha-beta search over a pool of worker processes.
+
+The root moves are split between the workers, and each worker searches its share with its own AlphaBetaSearch,
+transposition table and move ordering. Processes are used rather than threads, since the search is pure Python and
+threads would be serialized by the GIL.
+
+Each worker reports the best of its moves after every completed depth over a queue, and the best move of the deepest
+depth completed by every worker is published to ret_val as the results arrive.
+"""
+import multiprocessing
+import os
+import queue
+import time
+
+from .deadline import publish_move
+from .ordering import MoveOrdering
+from .search import AlphaBetaSearch, material
+from .transposition import TranspositionTable
+
+# Seconds between checks of the stop signal while waiting for results
+_POLL_INTERVAL = 0.05
+
+# Search of each worker process, set up by _init_worker
+_worker_search = None
+_worker_queue = None
+
+
+def _init_worker(result_queue, table_size_mb, evaluate):
+    """Sets up the search of a worker process, which is kept for the whole game."""
+    global _worker_search, _worker_queue
+    _worker_queue = result_queue
+    _worker_search = AlphaBetaSearch(evaluate, table=TranspositionTable(table_size_mb), ordering=MoveOrdering())
+
+
+def _search_worker(search_id, worker, board, indexes, end_time):
+    """Searches a share of the root moves in a worker process.
+
+    A result (search_id, worker, depth, score, move index) is put on the queue after each completed depth, followed by
+    (search_id, worker, None, stopped, None) when the search is finished, where stopped is whether the search was
+    stopped by the time limit rather than searching the moves to the end.
+
+    :param search_id: Identifier of the search, so results of an earlier search can be told apart
+    :param worker: Index of the worker
+    :param board: Board to search from
+    :param indexes: Indexes in board.legal_moves() of the root moves to search
+    :param end_time: Value of time.monotonic() at which the search must stop
+    """
+    moves = board.legal_moves()
+
+    def publish(depth, score, move):
+        _worker_queue.put((search_id, worker, depth, score, moves.index(move)))
+
+    stopped = True
+    try:
+        _worker_search.search(board, end_time, [], [moves[i] for i in indexes], publish)
+        stopped = _worker_search.stopped
+    finally:
+        _worker_queue.put((search_id, worker, None, stopped, None))
+
+
+class ParallelSearch:
+    """Alpha-beta search with the root moves split between worker processes.
+
+    The worker processes are started when the ParallelSearch is created and kept until close is called, so they should
+    be created once per game rather than once per move.
+    """
+    def __init__(self, num_workers=None, table_size_mb=16, evaluate=material):
+        """Inits a ParallelSearch with the specified parameters.
+
+        :param num_workers: Number of worker processes, defaults to the number of CPUs
+        :param table_size_mb: Memory budget in MB of the transposition table of each worker
+        :param evaluate: Function of (board, player) returning the static score of a position for player. It must be
+        defined at module level so it can be sent to the workers.
+        """
+        self.num_workers = num_workers or os.cpu_count() or 1
+        self._queue = multiprocessing.Queue()
+        self._pool = multiprocessing.Pool(self.num_workers, _init_worker, (self._queue, table_size_mb, evaluate))
+        self._search_id = 0
+        self.depth = 0  # Deepest depth completed by every worker in the last call to search
+
+    def search(self, board, end_time, ret_val, stop=None):
+        """Searches for the best move for the player to move.
+
+        :param board: Board to search from
+        :param end_time: Value of time.monotonic() at which the search must stop. Results are collected until then.
+        :param ret_val: List which the best move found so far is published to with publish_move
+        :param stop: threading.Event or Deadline which stops collecting results when set. The workers stop at end_time.
+        :returns list: Best move found
+        """
+        self.depth = 0
+        moves = board.legal_moves()
+        if len(moves) == 0:
+            return []
+        publish_move(ret_val, moves[0])
+        if len(moves) == 1:
+            return moves[0]
+
+        self._search_id += 1
+        num_workers = min(self.num_workers, len(moves))
+        for worker in range(num_workers):
+            self._pool.apply_async(_search_worker, (self._search_id, worker, board,
+                                                    list(range(worker, len(moves), num_workers)), end_time))
+
+        # Results of each worker by depth, and the deepest depth each worker is known to have completed. A worker which
+        # searched its moves to the end has completed every depth.
+        results = [{} for _ in range(num_workers)]
+        completed = [0] * num_workers
+        running = num_workers
+        best_move = moves[0]
+        while running > 0 and time.monotonic() < end_time and (stop is None or not stop.is_set()):
+            try:
+                search_id, worker, depth, score, index = self._queue.get(
+                    timeout=max(0, min(end_time - time.monotonic(), _POLL_INTERVAL)))
+            except queue.Empty:
+                continue
+            if search_id != self._search_id:
+                continue  # Late result of an earlier search
+            if depth is None:
+                running -= 1
+                if not score and len(results[worker]):
+                    completed[worker] = float('inf')
+            else:
+                results[worker][depth] = (score, index)
+                completed[worker] = max(completed[worker], depth)
+            move = self._best_result(results, min(completed), moves)
+            if move is not None:
+                best_move = move
+                publish_move(ret_val, best_move)
+        return best_move
+
+    def _best_result(self, results, depth, moves):
+        """Finds the best move at a depth completed by every worker.
+
+        :param results: Results of each worker by depth
+        :param depth: Depth completed by every worker. Workers which finished at a shallower depth searched their moves
+        to the end, so their last result is used.
+        :param moves: Legal moves of the root
+        :returns list: Best move, or None if no depth has been completed by every worker
+        """
+        if depth == 0:
+            return None
+        best = None
+        for worker_results in results:
+            score, index = worker_results[min(depth, max(worker_results))]
+            if best is None or score > best[0]:
+                best = (score, index)
+        self.depth = max([max(worker_results) for worker_results in results]) if depth == float('inf') else depth
+        return moves[best[1]]
+
+    def close(self):
+        """Stops the worker processes."""
+        self._pool.terminate()
+        self._pool.join()
+        self._queue.close()
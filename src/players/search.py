@@ -0,0 +1,335 @@
+"""
+search.py
+    - Depth-first game tree search for the AI players.
+
+The search works on a single board in place with make_move/unmake_move, so only the current line is kept in memory.
+Scores are from the point of view of the player to move at each node (negamax).
+"""
+import random
+import time
+
+from .deadline import publish_move
+from .transposition import EXACT, LOWER, UPPER, NO_MOVE
+
+# Score of a won position. Wins found closer to the root score higher, so the shortest win is preferred.
+WIN_SCORE = 1000000
+
+# Scores beyond this are wins or losses at a known distance from the node
+_WIN_THRESHOLD = WIN_SCORE - 1000
+
+# Number of nodes searched between checks of the clock
+_CLOCK_INTERVAL = 256
+
+
+# Keys xor'ed into the position hash for each value of the end game move counter, see table_key. A counter of 0 adds
+# nothing. Counters are at most 40, when the game ends.
+_MOVE_COUNT_KEYS = [0] + [random.Random('AlphaBetaSearch move count {}'.format(count)).getrandbits(64)
+                          for count in range(1, 41)]
+
+
+# Integer weights of the evaluation terms (men, kings, advancement, back_rank) used by positional
+POSITIONAL_WEIGHTS = (100, 300, 5, 10)
+
+# Set to True to check the incremental evaluation terms of each board scored against a full recomputation. This is
+# much slower, and only intended for debugging changes to move execution.
+DEBUG_EVALUATION = False
+
+
+def material(board, player):
+    """Scores a position by material, 1 per pawn and 3 per king.
+
+    Boards with incrementally updated evaluation terms, eg, CheckerBoard, are scored without scanning the board.
+
+    :param board: Board to score
+    :param player: Player whose point of view the score is from. 'w' for white, 'b' for black.
+    :returns int: Material of player minus material of the opponent
+    """
+    terms = getattr(board, 'evaluation_terms', None)
+    if terms is None:
+        return sum([(1 if i.lower() == player else -1) * (1 if i.islower() else 3) for i, _ in board.get_pieces()])
+    if DEBUG_EVALUATION:
+        board.check_evaluation_terms()
+    score = terms[0] + 3 * terms[1]
+    return score if player == 'w' else -score
+
+
+def positional(board, player):
+    """Scores a position by material, pawn advancement and back rank guards, weighted by POSITIONAL_WEIGHTS.
+
+    :param board: Board with incrementally updated evaluation terms, eg, CheckerBoard
+    :param player: Player whose point of view the score is from. 'w' for white, 'b' for black.
+    :returns int: Weighted score of player minus the weighted score of the opponent
+    """
+    if DEBUG_EVALUATION:
+        board.check_evaluation_terms()
+    men, kings, advancement, back_rank = board.evaluation_terms
+    men_weight, king_weight, advancement_weight, back_rank_weight = POSITIONAL_WEIGHTS
+    score = men_weight * men + king_weight * kings + advancement_weight * advancement + back_rank_weight * back_rank
+    return score if player == 'w' else -score
+
+
+def table_key(board):
+    """Gets the transposition table key of a position, its position_hash with the end game move counter folded in.
+
+    The score of a position depends on how many moves are left before the 40 move rule ends the game, so the same
+    position with a different counter must not share a table entry.
+
+    :param board: Board with a position_hash, eg, CheckerBoard
+    :returns int: 64-bit key
+    """
+    return board.position_hash ^ _MOVE_COUNT_KEYS[min(board._end_game_move_count, 40)]
+
+
+def _is_jump(move):
+    """Returns whether a move is a jump. Jumps move two rows at a time, steps one."""
+    return abs(move[1][0] - move[0][0]) == 2
+
+
+class AlphaBetaSearch:
+    """Alpha-beta search with iterative deepening.
+
+    The position is searched to depth 1, 2, 3, ... until the time runs out. The best move of each completed depth is
+    published to ret_val, so a usable move is always available, and the previous best move is searched first at the
+    next depth so most of the tree is pruned.
+    """
+    def __init__(self, evaluate=material, max_depth=100, table=None, ordering=None, quiescence_nodes=2000):
+        """Inits an AlphaBetaSearch with the specified parameters.
+
+        :param evaluate: Function of (board, player) returning the static score of a position for player
+        :param max_depth: Deepest depth to search
+        :param table: TranspositionTable used for cutoffs and move ordering, or None to search without one. It is only
+        used for boards with a position_hash, eg, CheckerBoard.
+        :param ordering: MoveOrdering used to order the moves of each position, or None to search the moves in the
+        order they are generated
+        :param quiescence_nodes: Most nodes searched by the quiescence search from a single leaf, 0 to evaluate leaves
+        in the middle of a capture sequence statically
+        """
+        self._evaluate = evaluate
+        self._max_depth = max_depth
+        self._table = table
+        self._ordering = ordering
+        self._quiescence_nodes = quiescence_nodes
+        self._quiescence_left = 0
+        self._use_table = False
+        self._root_moves = None
+        self._end_time = None
+        self._stop = None
+        self._stopped = False
+        self._depth_limited = False
+        self.nodes = 0  # Number of nodes searched by the last call to search, including quiescence nodes
+        self.quiescence_nodes = 0  # Number of quiescence nodes searched by the last call to search
+        self.depth = 0  # Deepest depth completed by the last call to search
+
+    @property
+    def stopped(self):
+        """Whether the last call to search was stopped by the time limit before it finished."""
+        return self._stopped
+
+    def search(self, board, end_time, ret_val, moves=None, on_depth=None, stop=None):
+        """Searches for the best move for the player to move.
+
+        :param board: Board to search from. It is restored before returning.
+        :param end_time: Value of time.monotonic() at which the search must stop
+        :param ret_val: List which the best move found so far is published to with publish_move
+        :param moves: Root moves to search, eg, a share of the legal moves in a parallel search. Defaults to all the
+        legal moves.
+        :param on_depth: Function of (depth, score, move) called after each completed depth
+        :param stop: threading.Event or Deadline which stops the search when set, eg, from another thread while
+        pondering
+        :returns list: Best move found
+        """
+        self._end_time = end_time
+        self._stop = stop
+        self._stopped = False
+        self.nodes = 0
+        self.quiescence_nodes = 0
+        self.depth = 0
+        legal_moves = board.legal_moves()
+        restricted = moves is not None
+        moves = list(moves) if restricted else legal_moves
+        if len(moves) == 0:
+            return []
+        self._use_table = self._table is not None and hasattr(board, 'position_hash')
+        self._root_moves = legal_moves if not restricted else None
+        hash_move = None
+        if self._use_table:
+            self._table.new_search()
+            # Search the best move stored by an earlier search first, eg, from the previous move of this game
+            entry = self._table.probe(table_key(board))
+            if entry is not None and entry[3] < len(legal_moves) and legal_moves[entry[3]] in moves:
+                hash_move = moves.index(legal_moves[entry[3]])
+        if self._ordering is not None:
+            self._ordering.new_search()
+            moves = [moves[i] for i in self._ordering.order(moves, 0, hash_move)]
+        elif hash_move is not None:
+            moves.insert(0, moves.pop(hash_move))
+        best_move = moves[0]
+        publish_move(ret_val, best_move)
+        if len(legal_moves) == 1:
+            return best_move
+
+        for depth in range(1, self._max_depth + 1):
+            self._depth_limited = False
+            score, move = self._search_root(board, moves, depth)
+            if self._stopped:
+                break
+            best_move = move
+            publish_move(ret_val, best_move)
+            self.depth = depth
+            if on_depth is not None:
+                on_depth(depth, score, move)
+            # Stop early if the game tree was searched to the end or the result is a forced win or loss
+            if not self._depth_limited or abs(score) >= _WIN_THRESHOLD:
+                break
+            # Search the best move first at the next depth
+            moves = [move] + [m for m in moves if m != move]
+        return best_move
+
+    def _search_root(self, board, moves, depth):
+        """Searches every root move to depth.
+
+        :returns tuple: Score and best move
+        """
+        alpha = -WIN_SCORE - 1
+        best_move = moves[0]
+        for move in moves:
+            token = board.make_move(move)
+            score = -self._alpha_beta(board, depth - 1, -WIN_SCORE - 1, -alpha, 1)
+            board.unmake_move(token)
+            if self._stopped:
+                break
+            if score > alpha:
+                alpha = score
+                best_move = move
+        # The score is only stored if every legal move was searched
+        if self._use_table and not self._stopped and self._root_moves is not None:
+            self._table.store(table_key(board), depth, EXACT, self._score_to_table(alpha, 0),
+                              self._root_moves.index(best_move))
+        return alpha, best_move
+
+    def _alpha_beta(self, board, depth, alpha, beta, ply):
+        """Searches a position to depth with an (alpha, beta) window.
+
+        :param board: Board to search
+        :param depth: Remaining depth
+        :param alpha: Lower bound of the window
+        :param beta: Upper bound of the window
+        :param ply: Distance from the root
+        :returns int: Score of the position for the player to move
+        """
+        self.nodes += 1
+        if self.nodes % _CLOCK_INTERVAL == 0 and self._out_of_time():
+            self._stopped = True
+            return 0
+
+        winner = board.get_winner()
+        if winner is not None:
+            if winner == 'd':
+                return 0
+            return WIN_SCORE - ply if winner == board.current_player else -WIN_SCORE + ply
+        if depth <= 0:
+            self._depth_limited = True
+            self._quiescence_left = self._quiescence_nodes
+            return self._quiesce(board, alpha, beta, ply)
+
+        moves = board.legal_moves()
+        hash_move = None
+        if self._use_table:
+            key = table_key(board)
+            entry = self._table.probe(key)
+            if entry is not None:
+                entry_depth, bound, score, hash_move = entry
+                if entry_depth >= depth:
+                    score = self._score_from_table(score, ply)
+                    if bound == EXACT or (bound == LOWER and score >= beta) or (bound == UPPER and score <= alpha):
+                        # The stored search may have been depth limited
+                        self._depth_limited = True
+                        return score
+                if hash_move >= len(moves):
+                    hash_move = None
+        if self._ordering is not None:
+            order = self._ordering.order(moves, ply, hash_move)
+        elif hash_move is not None:
+            # Search the best move of the earlier search first
+            order = [hash_move] + [i for i in range(len(moves)) if i != hash_move]
+        else:
+            order = range(len(moves))
+
+        original_alpha = alpha
+        best_index = NO_MOVE
+        for i in order:
+            token = board.make_move(moves[i])
+            score = -self._alpha_beta(board, depth - 1, -beta, -alpha, ply + 1)
+            board.unmake_move(token)
+            if self._stopped:
+                return 0
+            if score > alpha:
+                alpha = score
+                best_index = i
+                if alpha >= beta:
+                    if self._ordering is not None:
+                        self._ordering.record_cutoff(moves[i], ply, depth, i == order[0])
+                    break
+        if self._use_table:
+            bound = UPPER if alpha <= original_alpha else (LOWER if alpha >= beta else EXACT)
+            self._table.store(key, depth, bound, self._score_to_table(alpha, ply), best_index)
+        return alpha
+
+    def _out_of_time(self):
+        """Returns whether the search must stop, ie, the end time has passed or the stop event is set."""
+        return time.monotonic() >= self._end_time or (self._stop is not None and self._stop.is_set())
+
+    def _quiesce(self, board, alpha, beta, ply):
+        """Searches the forced jumps of a position until it is quiet, ie, the player to move cannot jump.
+
+        Captures are mandatory, so a position in the middle of a capture sequence can not be scored statically: the
+        material is about to change. Only jumps are searched, longest chain first, and the search falls back to the
+        static score once the node limit of the leaf is used up.
+
+        :param board: Board to search
+        :param alpha: Lower bound of the window
+        :param beta: Upper bound of the window
+        :param ply: Distance from the root
+        :returns int: Score of the position for the player to move
+        """
+        moves = board.legal_moves()
+        if len(moves) == 0:
+            return -WIN_SCORE + ply
+        if not _is_jump(moves[0]) or self._quiescence_left <= 0:
+            return self._evaluate(board, board.current_player)
+
+        for move in sorted(moves, key=len, reverse=True):
+            self._quiescence_left -= 1
+            self.nodes += 1
+            self.quiescence_nodes += 1
+            if self.nodes % _CLOCK_INTERVAL == 0 and self._out_of_time():
+                self._stopped = True
+                return 0
+            token = board.make_move(move)
+            score = -self._quiesce(board, -beta, -alpha, ply + 1)
+            board.unmake_move(token)
+            if self._stopped:
+                return 0
+            if score > alpha:
+                alpha = score
+                if alpha >= beta:
+                    break
+        return alpha
+
+    @staticmethod
+    def _score_to_table(score, ply):
+        """Converts a score to be stored in the table, so wins and losses are relative to the stored node."""
+        if score >= _WIN_THRESHOLD:
+            return score + ply
+        if score <= -_WIN_THRESHOLD:
+            return score - ply
+        return score
+
+    @staticmethod
+    def _score_from_table(score, ply):
+        """Converts a score read from the table to be relative to the root."""
+        if score >= _WIN_THRESHOLD:
+            return score - ply
+        if score <= -_WIN_THRESHOLD:
+            return score + ply
+        return score
@@ -1,89 +1,228 @@
 from .interface import AbstractPlayer
+from .evaluation import BatchEvaluator, MATERIAL_WEIGHTS, numpy_available
+from .search import AlphaBetaSearch, material, table_key
+from .transposition import TranspositionTable
+from .deadline import publish_move
+from .ordering import MoveOrdering
+from .parallel import ParallelSearch
 import time
 import collections
-import copy
+
+# Number of leaves scored per call to the BatchEvaluator. Small enough that scoring the last partial batch after the
+# tree is built takes a few milliseconds.
+_EVALUATION_CHUNK = 1 << 12
+
+# Seconds spent predicting the opponent's reply when it is not in the transposition table
+_PREDICTION_TIME = 0.05
 
 
 class SimpleAI(AbstractPlayer):
-    def __init__(self, board_size, player_num):
+    # Search algorithms which can be selected with the search parameter:
+    #   - alphabeta: depth-first alpha-beta search with iterative deepening, keeping only the current line in memory
+    #   - parallel: alpha-beta search with the root moves split between worker processes, one per CPU by default
+    #   - minimax: breadth-first minimax over the whole game tree, kept in memory until time expires
+    SEARCH_MODES = ('alphabeta', 'parallel', 'minimax')
+
+    def __init__(self, board_size, player_num, search='alphabeta', table_size_mb=16, num_workers=None):
         if isinstance(player_num, int):
             self._player = 'w' if player_num == 1 else 'b'
         elif isinstance(player_num, str):
             self._player = player_num
         else:
             raise ValueError("player_num must be either an int or a string.")
+        if search not in self.SEARCH_MODES:
+            raise ValueError("search must be one of {}.".format(', '.join(self.SEARCH_MODES)))
+        self._search = search
+        # The transposition table and move ordering tables are kept for the whole game, so positions searched for
+        # earlier moves are reused
+        self.table = TranspositionTable(table_size_mb) if search == 'alphabeta' else None
+        self.ordering = MoveOrdering() if search == 'alphabeta' else None
+        self._searcher = AlphaBetaSearch(table=self.table, ordering=self.ordering) if search == 'alphabeta' else None
+        if search == 'parallel':
+            # Worker processes are started once per game, so their startup does not count against the time limit
+            self._searcher = ParallelSearch(num_workers, table_size_mb)
+        # Scores the whole search frontier in one vectorized call when NumPy is available. The weights match
+        # ProcessingNode's per-leaf material count, so the chosen moves are the same either way.
+        self._evaluator = BatchEvaluator(board_size, MATERIAL_WEIGHTS) if numpy_available() else None
 
-    def move(self, board, time_limit, ret_val):
+    def move(self, board, time_limit, ret_val, deadline=None):
         start_time = time.monotonic()
         end_time = start_time + 0.85 * time_limit  # Only use a portion of allotted to account for overhead
-        nodes = collections.deque()
-        root_node = ProcessingNode(board, self._player)
-        nodes.append(root_node)
-        # Build game tree breadth-first until time expires
-        while time.monotonic() < end_time and len(nodes) > 0:
+        if self._searcher is not None:
+            # The best move of each completed depth is written to ret_val as the search runs
+            self._searcher.search(board, end_time, ret_val, stop=deadline)
+            return ret_val
+        # Publish a valid move straight away, in case the tree is not evaluated before the deadline
+        publish_move(ret_val, board.legal_moves()[0])
+        root_node = ProcessingNode()
+        nodes = collections.deque([root_node])
+        line = []  # Nodes and undo tokens of the moves made on board, from the root to the last node expanded
+        # Leaves are scored as they are created, so only the last partial batch is left to score when time expires
+        scorer = LeafScorer(self._evaluator, self._player)
+        # Build game tree breadth-first until time expires. Nodes only store their move, so the position of each node
+        # is derived by making the moves from the last node expanded, which is usually a sibling or cousin.
+        while time.monotonic() < end_time and len(nodes) > 0 and (deadline is None or not deadline.is_set()):
             node = nodes.popleft()
-            nodes.extend(node.generate_child_nodes())
+            ProcessingNode.walk_to(board, line, node)
+            nodes.extend(node.generate_child_nodes(board))
+            scorer.score_children(board, node)
+        ProcessingNode.walk_to(board, line, root_node)
+        scorer.flush()
+        if root_node.children is None:
+            # Stopped before the root was expanded
+            return ret_val
         # Best move needs to be added to ret_val to return to caller since this will be running on a separate thread
-        ret_val.extend(root_node.get_best_move())
+        publish_move(ret_val, root_node.get_best_move())
         return ret_val
 
+    def predict_reply(self, board):
+        if self._search != 'alphabeta':
+            return None
+        moves = board.legal_moves()
+        if len(moves) == 0:
+            return None
+        # The reply searched first by the last search is usually in the transposition table, otherwise a short search
+        # predicts it
+        entry = self.table.probe(table_key(board))
+        if entry is not None and entry[3] < len(moves):
+            return moves[entry[3]]
+        return AlphaBetaSearch(table=self.table, ordering=self.ordering).search(
+            board, time.monotonic() + _PREDICTION_TIME, [])
+
+    def ponder(self, board, stop):
+        # The search stores its results in the transposition table, which the next move reuses
+        if self._search == 'alphabeta':
+            self._searcher.search(board, float('inf'), [], stop=stop)
+
+    def close(self):
+        """Stops the worker processes of the parallel search, if any. The player should not be used afterwards."""
+        if self._search == 'parallel':
+            self._searcher.close()
+
     def get_name(self):
-        return "SimpleAI"
+        return "SimpleAI" if self._search == 'alphabeta' else "SimpleAI ({})".format(self._search)
 
 
 class ProcessingNode:
-    """A ProcessingNode represents a node in the game tree."""
-    def __init__(self, board, player, move=None):
+    """A ProcessingNode represents a node in the game tree.
+
+    Nodes only store the move which reached them, so a tree of hundreds of thousands of nodes stays small. The position
+    of a node is derived when needed by making the moves from the root on a single board.
+    """
+    __slots__ = ('move', 'parent', 'children', 'utility')
+
+    def __init__(self, move=None, parent=None):
         """Inits a ProcessingNode with the specified parameters.
 
-        :param board: CheckerBoard representation at this node.
-        :param player: Player whose optimal move the game tree is solving for. 'w' for white, 'b' for black.
-        :param move: Move which resulted in reaching this node.
+        :param move: Move which resulted in reaching this node, None for the root.
+        :param parent: ProcessingNode this node is a child of, None for the root.
         """
-        self._children = []
-        self._player = player
-        self._board = board
         self.move = move
+        self.parent = parent
+        self.children = None  # List of child nodes, None until the node is expanded
+        self.utility = None  # Utility of the node, cached once it is known
 
-    def calculate_utility(self):
-        """Calculate the utility of the move represented by this node."""
-        if len(self._children) == 0:
-            # If there are no children, this is leaf node. Utility based on pieces on the board.
-            return sum([(1 if i.lower() == self._player else -1) * (1 if i.islower() else 3)
-                        for row in self._board for i in row if i != 0 and i != '_'])
-        elif self._board.current_player == self._player:
-            # If this node represents a move by this player, the optimal move will be chosen, so return max of children
-            return max([c.calculate_utility() for c in self._children])
-        else:
-            # If this node represents a move by opponent, assume opponent will play optimally, so return min of children
-            return min([c.calculate_utility() for c in self._children])
+    @staticmethod
+    def walk_to(board, line, node):
+        """Makes and unmakes moves on board so it is in the position of node.
 
-    def generate_child_nodes(self):
+        :param board: Board in the position at the end of line
+        :param line: List of (node, undo token) of the moves made on board from the root, updated in place
+        :param node: ProcessingNode whose position board should be in
+        """
+        path = []
+        while node.parent is not None:
+            path.append(node)
+            node = node.parent
+        path.reverse()
+        common = 0
+        while common < len(line) and common < len(path) and line[common][0] is path[common]:
+            common += 1
+        while len(line) > common:
+            board.unmake_move(line.pop()[1])
+        for node in path[common:]:
+            line.append((node, board.make_move(node.move)))
+
+    def generate_child_nodes(self, board):
         """Creates children nodes in the game tree.
 
+        :param board: Board in the position of this node
         :return list: List of ProcessingNode descendants of this node.
         """
-        self._children.clear()
-        pieces = self._board.get_locations_by_color(self._board.current_player)
-        all_moves = []
-        all_jumps = []
-        for piece in pieces:
-            is_jump, moves = self._board.generate_moves(piece)
-            for move in moves:
-                # Execute move on copy of board and create new node
-                board_copy = copy.deepcopy(self._board)
-                board_copy.execute_move(move)
-                if is_jump:
-                    all_jumps.append(ProcessingNode(board_copy, self._player, move))
-                else:
-                    all_moves.append(ProcessingNode(board_copy, self._player, move))
-        if len(all_jumps) > 0:
-            self._children.extend(all_jumps)
-        else:
-            self._children.extend(all_moves)
-        return self._children
+        # The moves were generated by the board, so they do not need to be validated again when they are made
+        self.children = [ProcessingNode(move, self) for move in board.legal_moves()]
+        if self.children:
+            # The utility of the node is now backed up from its children rather than scored
+            self.utility = None
+        return self.children
+
+    def calculate_utility(self, maximizing):
+        """Calculate the utility of the move represented by this node.
+
+        The utility of a leaf is calculated by a LeafScorer. The utility of other nodes is backed up from their
+        children and cached, so each subtree is only calculated once.
+
+        :param maximizing: Whether the player the game tree is solving for is to move at this node
+        """
+        if self.utility is None:
+            if maximizing:
+                # If this node represents a move by this player, the optimal move will be chosen, so use max of children
+                self.utility = max([c.calculate_utility(False) for c in self.children])
+            else:
+                # If this node represents a move by opponent, assume opponent will play optimally, so use min of
+                # children
+                self.utility = min([c.calculate_utility(True) for c in self.children])
+        return self.utility
 
     def get_best_move(self):
         """Returns the move corresponding to the child node with the highest utility."""
-        return max(self._children, key=lambda c: c.calculate_utility()).move
+        return max(self.children, key=lambda c: c.calculate_utility(False)).move
+
+
+class LeafScorer:
+    """Scores the leaves of a game tree as they are created.
+
+    With a BatchEvaluator, the positions of new leaves are collected and scored _EVALUATION_CHUNK at a time, so the time
+    left to score the tree once it is built is bounded, however large the tree is. Otherwise each leaf's material is
+    counted as it is created.
+    """
+    def __init__(self, evaluator, player):
+        """Inits a LeafScorer with the specified parameters.
+
+        :param evaluator: BatchEvaluator to score the leaves with, or None to count material one leaf at a time
+        :param player: Player whose optimal move the game tree is solving for. 'w' for white, 'b' for black.
+        """
+        self._evaluator = evaluator
+        self._player = player
+        self._leaves = []
+        self._positions = []
+
+    def score_children(self, board, node):
+        """Scores the children of a node which was just expanded.
+
+        :param board: Board in the position of node. It is restored before returning.
+        :param node: ProcessingNode whose children were generated
+        """
+        for child in node.children:
+            token = board.make_move(child.move)
+            if self._evaluator is not None:
+                self._leaves.append(child)
+                self._positions.append(board.get_squares())
+            else:
+                child.utility = material(board, self._player)
+            board.unmake_move(token)
+        if len(self._leaves) >= _EVALUATION_CHUNK:
+            self.flush()
 
+    def flush(self):
+        """Scores the leaves collected so far."""
+        if not self._leaves:
+            return
+        # Packed squares are signed bytes
+        utilities = self._evaluator.evaluate(memoryview(b''.join(self._positions)).cast('b'), self._player)
+        for node, utility in zip(self._leaves, utilities.tolist()):
+            # A leaf expanded since it was collected has its utility backed up from its children instead
+            if not node.children:
+                node.utility = utility
+        self._leaves = []
+        self._positions = []
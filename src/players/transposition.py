@@ -0,0 +1,139 @@
+"""
+transposition.py
+    - Fixed size transposition table for the game tree search.
+
+Entries are stored in two flat arrays of unsigned 64-bit integers, one holding the position hash and one holding the
+packed entry data, so the table uses exactly 16 bytes per entry regardless of how many positions are stored. The packed
+data holds, from the lowest bits:
+    - bound: 2 bits, EXACT, LOWER or UPPER (0 marks an empty entry)
+    - depth: 8 bits, remaining depth the position was searched to
+    - generation: 6 bits, the search which stored the entry
+    - move: 16 bits, index of the best move in the position's legal_moves, or NO_MOVE
+    - score: 32 bits, offset to be unsigned
+"""
+from array import array
+
+# Bound types. The score of an EXACT entry is the true score. LOWER entries failed high, so the true score is at least
+# the stored score, and UPPER entries failed low, so the true score is at most the stored score.
+EXACT = 1
+LOWER = 2
+UPPER = 3
+
+# Move index stored when an entry has no best move
+NO_MOVE = 0xFFFF
+
+_ENTRY_BYTES = 16
+_SCORE_OFFSET = 1 << 31
+_MAX_DEPTH = 0xFF
+_GENERATIONS = 0x40
+
+
+class TranspositionTable:
+    """A transposition table with a fixed memory budget.
+
+    The table is organized in buckets of two entries. The first entry of a bucket is depth-preferred: it is only
+    replaced by a search of at least the same depth, or by any search once it is left over from an earlier move. The
+    second entry is always replaced, so recent positions are kept even when the first entry holds a deep search.
+
+    The table is intended to be kept for a whole game, with new_search called before each move so entries from earlier
+    moves are still used but can be replaced.
+    """
+    def __init__(self, size_mb=16):
+        """Inits a TranspositionTable with the specified parameters.
+
+        :param size_mb: Memory budget of the table in MB
+        :raises ValueError: if size_mb is too small to hold a bucket
+        """
+        self._num_buckets = int(size_mb * (1 << 20)) // (2 * _ENTRY_BYTES)
+        if self._num_buckets < 1:
+            raise ValueError("size_mb must be large enough to hold at least one bucket.")
+        self._keys = array('Q', bytes(16 * self._num_buckets))
+        self._data = array('Q', bytes(16 * self._num_buckets))
+        self._generation = 0
+        self.hits = 0  # Number of probes which found the position
+        self.misses = 0  # Number of probes which did not find the position
+        self.stores = 0  # Number of entries written
+        self.overwrites = 0  # Number of entries for another position which were replaced by a store
+
+    def __len__(self):
+        """Returns the number of entries the table can hold."""
+        return 2 * self._num_buckets
+
+    def new_search(self):
+        """Marks the start of a new search, so entries stored by earlier searches can be replaced."""
+        self._generation = (self._generation + 1) % _GENERATIONS
+
+    def clear(self):
+        """Removes every entry and resets the counters."""
+        self._keys = array('Q', bytes(16 * self._num_buckets))
+        self._data = array('Q', bytes(16 * self._num_buckets))
+        self._generation = 0
+        self.hits = self.misses = self.stores = self.overwrites = 0
+
+    def probe(self, key):
+        """Looks up a position.
+
+        :param key: 64-bit hash of the position, eg, search.table_key
+        :returns tuple: (depth, bound, score, move index) of the entry, or None if the position is not in the table
+        """
+        index = 2 * (key % self._num_buckets)
+        keys = self._keys
+        if keys[index] != key:
+            index += 1
+            if keys[index] != key:
+                self.misses += 1
+                return None
+        data = self._data[index]
+        if data == 0:
+            self.misses += 1
+            return None
+        self.hits += 1
+        return (data >> 2) & _MAX_DEPTH, data & 3, (data >> 32) - _SCORE_OFFSET, (data >> 16) & 0xFFFF
+
+    def store(self, key, depth, bound, score, move=NO_MOVE):
+        """Stores the result of searching a position.
+
+        :param key: 64-bit hash of the position, eg, search.table_key
+        :param depth: Remaining depth the position was searched to
+        :param bound: EXACT, LOWER or UPPER
+        :param score: Score of the position
+        :param move: Index of the best move in the position's legal_moves, or NO_MOVE
+        """
+        data = (((score + _SCORE_OFFSET) << 32) | (move << 16) | (self._generation << 10) |
+                (min(depth, _MAX_DEPTH) << 2) | bound)
+        index = 2 * (key % self._num_buckets)
+        keys = self._keys
+        preferred = self._data[index]
+        if (keys[index] == key or preferred == 0 or depth >= (preferred >> 2) & _MAX_DEPTH or
+                (preferred >> 10) & (_GENERATIONS - 1) != self._generation):
+            if keys[index] != key and preferred != 0:
+                # The replaced depth-preferred entry is moved to the always-replace entry
+                if keys[index + 1] != key:
+                    self._count_overwrite(index + 1)
+                keys[index + 1] = keys[index]
+                self._data[index + 1] = preferred
+            elif keys[index + 1] == key:
+                # Remove the older copy of this position
+                self._data[index + 1] = 0
+        else:
+            index += 1
+            if keys[index] != key:
+                self._count_overwrite(index)
+        keys[index] = key
+        self._data[index] = data
+        self.stores += 1
+
+    def _count_overwrite(self, index):
+        """Counts an overwrite if the entry at index is about to be replaced while holding a position."""
+        if self._data[index] != 0:
+            self.overwrites += 1
+
+    def get_stats(self):
+        """Gets the counters and usage of the table.
+
+        :returns dict: Counters, number of entries used and hit rate of probes
+        """
+        probes = self.hits + self.misses
+        return {'hits': self.hits, 'misses': self.misses, 'stores': self.stores, 'overwrites': self.overwrites,
+                'used': sum(1 for data in self._data if data != 0), 'size': len(self),
+                'hit_rate': self.hits / probes if probes else 0.0}
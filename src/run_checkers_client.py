@@ -12,15 +12,16 @@ CHANGE LOG:
 from utils.jsonsocket import *
 from msgs.messages import *
 from players.simple_ai import SimpleAI
+from players.deadline import Deadline, accepts_deadline
 from board import CheckerBoard
+from threading import Event, Thread
 import socket
-import copy
 
 cc = object
 
 
 class CheckersClient:
-    def __init__(self, name, host, port, player):
+    def __init__(self, name, host, port, player, ponder=False):
         self._host = host
         self._port = port
         self._name = name
@@ -38,6 +39,12 @@ class CheckersClient:
 
         self.board = object
 
+        # Pondering: search the position after the predicted reply while the opponent is thinking
+        self._ponder = ponder
+        self._ponder_move = None
+        self._ponder_stop = None
+        self._ponder_thread = None
+
     def connect(self):
         # Try to connect to the server
         try:
@@ -133,7 +140,8 @@ class CheckersClient:
             elif message['id'] == MESSAGE_IDS['YOUR_TURN'].value and self.state == "PLAYING":
                 print("[+] My Turn!")
                 ret_val = []
-                self.player.move(board=copy.deepcopy(self.board), time_limit=self._timeout, ret_val=ret_val)
+                kwargs = {'deadline': Deadline(self._timeout)} if accepts_deadline(self.player) else {}
+                self.player.move(board=self.board.clone(), time_limit=self._timeout, ret_val=ret_val, **kwargs)
 
                 my_move = Move(ret_val)
                 print("[.] Playing move {}".format(ret_val))
@@ -147,10 +155,14 @@ class CheckersClient:
 
                 print("[.] Received Move {}".format(move.move_list))
 
+                self._stop_pondering(move.move_list)
                 self.board.execute_move(move.move_list)
                 self.previous_state = self.state
+                if self._ponder and self.board.current_player != self._color and self.board.get_winner() is None:
+                    self._start_pondering()
 
             elif message['id'] == MESSAGE_IDS['GAME_OVER'].value and self.state == "PLAYING":
+                self._stop_pondering()
                 go = GameOver()
                 go.from_dict(message)
 
@@ -165,13 +177,41 @@ class CheckersClient:
             elif message['id'] == MESSAGE_IDS['ERROR_MESSAGE'].value:
                 print("[!] Error Message Received! {}".format(message['error_name']))
 
-                if message['name'] == ERRORS['OPPONENT_DISCONNECTED'].name:
+                if message['error_name'] == ERRORS['OPPONENT_DISCONNECTED'].name:
+                    self._stop_pondering()
                     self.state = "GAME_OVER"
                     print("[+] Opponent Disconnected.")
                     print("[+] Victory!")
 
+    def _start_pondering(self):
+        """Starts searching the position after the opponent's predicted reply on a separate thread."""
+        self._ponder_move = self.player.predict_reply(self.board.clone())
+        if self._ponder_move is None:
+            return
+        board = self.board.clone()
+        board.make_move(self._ponder_move)
+        self._ponder_stop = Event()
+        self._ponder_thread = Thread(target=self.player.ponder, args=(board, self._ponder_stop))
+        self._ponder_thread.start()
+        print("[.] Pondering on predicted reply {}".format(self._ponder_move))
+
+    def _stop_pondering(self, move=None):
+        """Stops pondering, if running, and waits for the search to stop.
+
+        :param move: Move received from the server, used to report whether the prediction was correct
+        """
+        if self._ponder_thread is None:
+            return
+        self._ponder_stop.set()
+        self._ponder_thread.join()
+        if move is not None:
+            print("[.] Ponder {}".format("hit" if list(move) == list(self._ponder_move) else "miss"))
+        self._ponder_thread = None
+        self._ponder_move = None
+
     def shutdown(self):
         print("[-] Shutting Down...")
+        self._stop_pondering()
         self._client.close()
 
 
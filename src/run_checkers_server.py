@@ -1,6 +1,6 @@
 """
 run_checkers_server.py
-    - Main callable method for executing a server-run simulation with a PyGame GUI.
+    - Main callable method for executing a server-run simulation.
 
 Anthony Trezza
 15 Dec 2017
@@ -8,22 +8,99 @@ Anthony Trezza
 CHANGE LOG:
     - 15 Dec 2017 trezza - Software's Birthday! <(^.^)>
 
+The server runs on asyncio: clients are accepted and their connection requests read without blocking each other, and
+each game is a coroutine, so a single process can host hundreds of simultaneous games. The messages exchanged with the
+clients are the ones defined in msgs.messages.
 """
 
+import asyncio
+import signal
 import socket
-import sys
-from threading import Thread
 from utils import Spinner
-from utils.jsonsocket import Server
+from utils.jsonsocket import json_send_async, json_recv_async
 from msgs.messages import *
-from board_server import CheckerBoardServer
+from board_server import GameEngine
 
 # Define the global checkers server object
 gs = object
 
 
+class ClientConnection:
+    """A connected client.
+
+    Once the client has joined, its messages are read by a separate task into a queue, so waiting for a message can
+    time out without leaving a message half read, and a disconnection is noticed even when it is not the client's turn.
+    """
+    def __init__(self, name, reader, writer):
+        self.name = name
+        self.address = writer.get_extra_info('peername')
+        self._reader = reader
+        self._writer = writer
+        self._messages = asyncio.Queue()
+        self._read_task = asyncio.ensure_future(self._read())
+
+    async def _read(self):
+        """Reads messages into the queue until the connection is closed, then queues None."""
+        try:
+            while True:
+                await self._messages.put(await json_recv_async(self._reader))
+        except (asyncio.IncompleteReadError, asyncio.LimitOverrunError, ConnectionError, ValueError):
+            pass
+        finally:
+            self._messages.put_nowait(None)
+
+    @property
+    def connected(self):
+        """Whether the connection is still open, as far as is known."""
+        return not self._read_task.done()
+
+    async def send(self, message):
+        """Sends a message, eg, a message object from msgs.messages.
+
+        :returns bool: true if the message was sent, false if the client has disconnected
+        """
+        try:
+            await json_send_async(self._writer, dict(message))
+            return True
+        except ConnectionError:
+            return False
+
+    async def recv(self, timeout):
+        """Waits for the next message.
+
+        :param timeout: Time in seconds to wait
+        :returns dict: Message received, or None if the client has disconnected
+        :raises asyncio.TimeoutError: if no message was received within timeout
+        """
+        return await asyncio.wait_for(self._messages.get(), timeout)
+
+    def discard_messages(self):
+        """Discards the messages received so far, eg, a move which arrived after its deadline.
+
+        :returns bool: true if the client is still connected
+        """
+        while not self._messages.empty():
+            if self._messages.get_nowait() is None:
+                self._messages.put_nowait(None)
+                return False
+        return True
+
+    def close(self):
+        self._read_task.cancel()
+        self._writer.close()
+
+
 class GameServer:
-    def __init__(self, tcp_port, timeout, max_games, num_players):
+    def __init__(self, tcp_port, timeout, max_games, num_players, board_size=10):
+        """Inits a GameServer with the specified parameters.
+
+        :param tcp_port: Port to accept clients on
+        :param timeout: Time in seconds clients have to send their connection request, and to make each move
+        :param max_games: Most games played at the same time. Pairs of clients wait for a game to finish beyond this.
+        :param num_players: Number of players per game, which must be 2
+        :param board_size: Size of the square board to be used. Must be even and >= 4.
+        :raises ValueError: if a parameter is invalid
+        """
         # Check the port number to ensure it is an integer
         if not isinstance(tcp_port, int):
             raise ValueError("tcp_port must be an integer port")
@@ -33,155 +110,218 @@ class GameServer:
             raise ValueError("timeout is invalid.  Ensure that it is an integer in the range from (0, 60) exclusively.")
 
         # Check the max_games
-        if not isinstance(max_games, int) or max_games <= 0 or max_games >= 10:
-            raise ValueError("max_games is invalid.  Ensure that it is an integer in the range from (0, 10) exclusively.")
+        if not isinstance(max_games, int) or max_games <= 0:
+            raise ValueError("max_games is invalid.  Ensure that it is a positive integer.")
 
         # Check the number of players
-        if not isinstance(num_players, int) or num_players <= 0 or num_players >= 10:
-            raise ValueError("num_players is invalid.  Ensure that it is an integer in the range from (0, 10) exclusively.")
+        if num_players != 2:
+            raise ValueError("num_players is invalid.  Checkers games are played by 2 players.")
 
         # Initialize the class properties
         self._tcp_port = tcp_port
         self._max_games = max_games
         self._timeout = timeout
         self._num_players = num_players
-        self._games = []
-        self._game_threads = []
-        self._server = object
+        self._board_size = board_size
+        self._games = set()  # Tasks of the games being played
+        self._handshakes = set()  # Tasks of the clients which have not sent their connection request yet
+        self._waiting = []  # Clients waiting for an opponent, in the order they joined
+        self._server = None
+        self._stopped = None
         self._spinner = object
 
-    def open_socket(self):
+    async def open_socket(self):
         print("[+] Opening Server Socket ...")
-        self._server = Server(socket.gethostname(), self._tcp_port, self._timeout)
+        self._server = await asyncio.start_server(self._handle_client, socket.gethostname(), self._tcp_port,
+                                                  reuse_address=True)
 
-    def close_socket(self):
+    async def close_socket(self):
         print("[-] Closing Server Socket...")
         self._server.close()
+        await self._server.wait_closed()
 
-    def run(self):
+    async def run(self):
+        """Serves clients until stop is called, or the process is interrupted, then shuts down."""
         print("[+] Running Server ...")
-        clients = []
-        client_names = []
-        num_clients = 0
+        self._stopped = asyncio.Event()
+        loop = asyncio.get_running_loop()
+        for sig in (signal.SIGINT, signal.SIGTERM):
+            try:
+                loop.add_signal_handler(sig, self.stop)
+            except (NotImplementedError, RuntimeError):
+                pass  # Signal handlers are not supported on every platform, Ctrl+C raises KeyboardInterrupt instead
+        if self._server is None:
+            await self.open_socket()
 
         # Launch the spinner in another thread.... Just for coolness.
         self._spinner = Spinner.Spinner(self._timeout)
         self._spinner.start()
-        while True:
-            # Keep accepting clients until the number of players is met
-            while num_clients < self._num_players:
-                try:
-                    client, client_addr = self._server.accept()
-                except socket.timeout:
-                    continue
-
-                # Set the client's timeout to the same timeout as our own (to prevent blocking)
-                client.settimeout(self._timeout)
-
-                try:
-                    # Read the incoming message
-                    msg = self._server.recv(client)
-
-                    # Try casting that message to a connection request
-                    conReq = ConnectionRequest()
-                    conReq.from_dict(msg)
-                    id = conReq.id
-                    name = conReq.name
-
-                    # Ensure the ID is correct
-                    if id != MESSAGE_IDS["CONNECTION_REQUEST"].value:
-                        print("[.] Wrong Message Received.  Expected ID: " + str(MESSAGE_IDS["CONNECTION_REQUEST"].value)
-                              + ", RECEIVED ID: " + str(id))
-                        self._server.send(client, dict(ErrorMessage(ERRORS.INVALID_MSG)))
-                        continue
-
-                    # If the message doesn't have the name field populated from the message dictionary, this is invalid
-                    if not name:
-                        print("[.] name field in the Connection Request Message is required.")
-                        self._server.send(client, dict(ErrorMessage(ERRORS.INVALID_MSG)))
-                        continue
-
-                except ValueError:
-                    print("[-] Invalid Message Received from IP Address " + str(client_addr[0]) +
-                          ", Port " + str(client_addr[1]))
-                    self._server.send(client, dict(ErrorMessage(ERRORS.INVALID_MSG)))
-                    continue
-
-                except ConnectionResetError:
-                    print("[-] Client {} Died.".format(str(client_addr[0])))
-                    continue
-
-                # The message was received successfully!  Print the name
-                print("[+] New Client " + name + " at IP Address " + str(client_addr[0]) + ", Port " + str(client_addr[1]))
-
-                # Add the new client to the current clients list
-                clients.append(client)
-                client_names.append(name)
-                num_clients += 1
-
-                # If there is an insufficient number of players to make a game, send the waiting for opponents messages
-                # to reassure the player that they've been heard and will be sent a game as soon as an opponent is found
-                if num_clients < self._num_players:
-                    print("[.] Waiting for Opponent... ")
-                    w4o = WaitingForOpponent(True)
-                    self._server.send(client, dict(w4o))
-
-            # Verify neither of the clients have died
-            for idx, client in enumerate(clients):
+        try:
+            await self._stopped.wait()
+        finally:
+            await self.shutdown()
+
+    def stop(self):
+        """Stops the server. Must be called from the event loop's thread."""
+        if self._stopped is not None:
+            self._stopped.set()
+
+    async def _handle_client(self, reader, writer):
+        """Reads the connection request of a new client, and adds it to the clients waiting for an opponent."""
+        self._handshakes.add(asyncio.current_task())
+        client_addr = writer.get_extra_info('peername')
+        try:
+            # Read the incoming message, which must arrive within the timeout so a silent client is not kept open
+            try:
+                msg = await asyncio.wait_for(json_recv_async(reader), self._timeout)
+
+                # Try casting that message to a connection request
+                conReq = ConnectionRequest()
+                conReq.from_dict(msg)
+                id = conReq.id
+                name = conReq.name
+            except (ValueError, TypeError, AttributeError, asyncio.LimitOverrunError):
+                print("[-] Invalid Message Received from IP Address " + str(client_addr[0]) +
+                      ", Port " + str(client_addr[1]))
+                await json_send_async(writer, dict(ErrorMessage(ERRORS.INVALID_MSG)))
+                writer.close()
+                return
+            except (asyncio.TimeoutError, asyncio.IncompleteReadError, ConnectionError):
+                print("[-] Client {} Died.".format(str(client_addr[0])))
+                writer.close()
+                return
+
+            # Ensure the ID is correct
+            if id != MESSAGE_IDS["CONNECTION_REQUEST"].value:
+                print("[.] Wrong Message Received.  Expected ID: " + str(MESSAGE_IDS["CONNECTION_REQUEST"].value)
+                      + ", RECEIVED ID: " + str(id))
+                await json_send_async(writer, dict(ErrorMessage(ERRORS.INVALID_MSG)))
+                writer.close()
+                return
+
+            # If the message doesn't have the name field populated from the message dictionary, this is invalid
+            if not name:
+                print("[.] name field in the Connection Request Message is required.")
+                await json_send_async(writer, dict(ErrorMessage(ERRORS.INVALID_MSG)))
+                writer.close()
+                return
+        except (ConnectionError, asyncio.CancelledError):
+            writer.close()
+            raise
+        finally:
+            self._handshakes.discard(asyncio.current_task())
+
+        # The message was received successfully!  Print the name
+        print("[+] New Client " + name + " at IP Address " + str(client_addr[0]) + ", Port " + str(client_addr[1]))
+        client = ClientConnection(name, reader, writer)
+        self._waiting.append(client)
+        self._start_games()
+        if client in self._waiting:
+            # Reassure the player that they've been heard and will be sent a game as soon as an opponent is found
+            print("[.] Waiting for Opponent... ")
+            await client.send(WaitingForOpponent(True))
+
+    def _start_games(self):
+        """Starts games for the clients waiting for an opponent, as long as there are fewer than max_games games."""
+        # Forget the clients which died while waiting
+        for client in [client for client in self._waiting if not client.connected]:
+            print("[-] Dead client {} at IP address {}".format(client.name, client.address))
+            self._waiting.remove(client)
+            client.close()
+
+        while len(self._waiting) >= self._num_players and len(self._games) < self._max_games:
+            clients = self._waiting[:self._num_players]
+            del self._waiting[:self._num_players]
+            game = asyncio.ensure_future(self._play_game(clients))
+            self._games.add(game)
+            game.add_done_callback(self._game_finished)
+
+    def _game_finished(self, game):
+        """Removes a finished game, and starts the next game if clients are waiting."""
+        self._games.discard(game)
+        if not self._stopped.is_set():
+            self._start_games()
+
+    async def _play_game(self, clients):
+        """Plays a game between two clients, white first.
+
+        Each player has timeout seconds to send its move after it is sent YourTurn. A late, invalid or missing move is
+        replaced by a random move. Each move is sent to both players.
+
+        :param clients: ClientConnection of the white and the black player
+        """
+        # Once we have enough players, instantiate the game!
+        sent = [await client.send(WaitingForOpponent(False)) for client in clients]
+        if not all(sent):
+            # Put the clients which are still connected back at the front of the queue
+            for client, ok in zip(clients, sent):
+                if not ok:
+                    print("[-] Client {} Died.".format(client.name))
+                    client.close()
+            self._waiting[:0] = [client for client, ok in zip(clients, sent) if ok]
+            return
+        print("[+] Starting Game!")
+
+        game = GameEngine(self._board_size)
+        players = list(zip(['w', 'b'], clients))
+        try:
+            # Send the rules and the begin game messages!
+            for player_color, client in players:
+                gr = GameRules(player_color=player_color, num_players=self._num_players, time_limit=self._timeout,
+                               board_size=self._board_size)
+                if not (await client.send(gr) and await client.send(BeginGame())):
+                    print("[-] Player: {} Disconnected.".format(player_color))
+                    game.end('b' if player_color == 'w' else 'w')
+                    break
+
+            # Loop until end game conditions met
+            while game.winner is None:
+                player_color, client = players[game.move_ind % 2]
+
+                # Send the 'your turn' message, after discarding any move which arrived after an earlier deadline
+                connected = client.discard_messages() and await client.send(YourTurn())
                 try:
-                    data = self._server.recv(client)
-                except socket.timeout:
-                    continue
-                except ConnectionResetError:
-                    print("[-] Client {} Died.".format(str(client[1][0])))
-                    data = None
-
-                if not data:
-                    print("[-] Dead client idx " + str(idx) + " at IP address " + str(client[1][0]) + " and port " +
-                          str(client[1][1]))
-                    num_clients -= 1
-                    conn.close_client()
-                    del clients[idx]
-
-            if len(clients) < self._num_players:
-                print("[.] Not Enough Players... Still Searching...")
-                w4o = WaitingForOpponent(True)
-                for idx, client in enumerate(clients):
-                    try:
-                        self._server.send(client, dict(w4o))
-                    except ConnectionResetError:
-                        print("[-] Client {} Died.".format(str(client[1][0])))
-                        num_clients -= 1
-                        conn.close_client()
-                        del clients[idx]
-                continue
-
-            # Once we have enough players, instantiate the game!
-            print("[+] Starting Game!")
-            w4o = WaitingForOpponent(False)
-            for idx, client in enumerate(clients):
-                self._server.send(client, dict(w4o))
-
-            game = CheckerBoardServer(clients,  client_names, self._timeout)
-            game_thread = Thread(target=game.play)
-            game_thread.start()
-            self._games.append(game)
-            self._game_threads.append(game_thread)
-
-            clients = []
-            client_names = []
-            num_clients = 0
-
-    def shutdown(self):
+                    data = await client.recv(self._timeout) if connected else None
+                except asyncio.TimeoutError:
+                    print('[!] Timed Out - Random Move made for ' + player_color)
+                    move_list = None
+                else:
+                    if data is None:
+                        print("[!] Player: {} Disconnected.".format(player_color))
+                        game.end('b' if player_color == 'w' else 'w')
+                        await players[(game.move_ind + 1) % 2][1].send(ErrorMessage(ERRORS.OPPONENT_DISCONNECTED))
+                        break
+                    move_list = game.read_move(data)
+                    if move_list is None:
+                        print("[!] Invalid Message Received from {}".format(player_color))
+                        print("[.] Generating random move...")
+
+                # Make the move (a random move if it is invalid), and send the official move to the players
+                move_list = game.play_move(move_list)
+                for tmp_player_color, tmp_client in players:
+                    await tmp_client.send(Move(move_list))
+        finally:
+            # A game cancelled by shutdown ends without a winner
+            print("[.] Congratulations {} You are the Winner!".format(game.winner))
+            for tmp_player_color, tmp_client in players:
+                await tmp_client.send(GameOver(game.winner))
+                tmp_client.close()
+
+    async def shutdown(self):
+        """Stops accepting clients, ends the games being played without a winner and closes every connection."""
         print("[-] Shutting Down...")
-        self.close_socket()
-        self._spinner.stop()
+        self._stopped.set()
+        if self._server is not None:
+            await self.close_socket()
+        if isinstance(self._spinner, Spinner.Spinner):
+            self._spinner.stop()
 
-        for game in self._games:
-            game.terminate_game()
-
-        for game_thread in self._game_threads:
-            game_thread.join(self._timeout)
+        for task in list(self._handshakes) + list(self._games):
+            task.cancel()
+        await asyncio.gather(*self._handshakes, *self._games, return_exceptions=True)
+        for client in self._waiting:
+            client.close()
+        self._waiting = []
 
 
 def main():
@@ -193,16 +333,11 @@ def main():
     global gs
 
     # Instantiate the game server
-    gs = GameServer(2004, 1.5, 2, 2)
+    gs = GameServer(2004, 1.5, 500, 2)
     try:
-        gs.open_socket()
-        gs.run()
-
+        asyncio.run(gs.run())
     except KeyboardInterrupt:
         print("[-] Ctrl+C!  Shutting down...")
-        pass
-    finally:
-        gs.shutdown()
 
 
 if __name__ == '__main__':
@@ -0,0 +1,375 @@
+"""
+tournament.py
+    - League tournaments between many AI players.
+
+A tournament takes a roster of player classes and plays them against each other, either as a round-robin, where every
+pair of players meets in every round, or as a Swiss tournament, where each round pairs players with similar scores who
+have not met yet. Each pairing plays games_per_pairing games with the colours alternated.
+
+The games of a round are packed onto a fixed pool of worker processes, one game per worker at a time, and each game is
+pinned to its own CPUs where supported, so each player has a whole CPU while it thinks. A round-robin has no dependency
+between its games, so all of them are scheduled at once.
+
+Results are rated with Elo, fitted by maximum likelihood over all the games, with 95% confidence intervals.
+
+A tournament given a state file appends the result of each game to it as it finishes. Running the same tournament with
+the same state file again skips the games already played, so an interrupted tournament can be resumed.
+
+Usage:
+    python tournament.py players.simple_ai.SimpleAI players.mcts.MCTSPlayer players.other.Bot --state league.jsonl
+    python tournament.py <players...> --pairing swiss --rounds 6 --size 10 --time 0.5 --workers 8
+"""
+import argparse
+import json
+import math
+import os
+
+from match import GameResult, create_pool, play_pinned_game, load_player, add_isolation_arguments, isolation_settings
+
+PAIRINGS = ('round_robin', 'swiss')
+
+# Ratings are fitted in Elo points, where a difference of 400 points means 10 to 1 odds
+_ELO_SCALE = math.log(10) / 400
+
+# Multiple of the standard error giving a 95% confidence interval
+_CONFIDENCE_Z = 1.96
+
+
+def player_label(player):
+    """Gets the label identifying a player class in a tournament, its dotted path, eg, 'players.simple_ai.SimpleAI'."""
+    return '{}.{}'.format(player.__module__, player.__qualname__)
+
+
+def round_robin_pairings(num_players):
+    """Pairs every player with every other player.
+
+    :param num_players: Number of players
+    :returns list: List of (player, opponent) index pairs
+    """
+    return [(i, j) for i in range(num_players) for j in range(i + 1, num_players)]
+
+
+def swiss_pairings(ranking, played, byes):
+    """Pairs players with similar scores for a round of a Swiss tournament.
+
+    Players are paired in ranking order with the highest ranked player they have not met yet. A player who has met
+    every remaining player is paired with the next one again. With an odd number of players, the lowest ranked player
+    without a bye gets a bye.
+
+    :param ranking: Player indexes, best first
+    :param played: Set of frozensets of the pairs of players who have met
+    :param byes: Set of the players who already had a bye
+    :returns tuple: List of (player, opponent) index pairs, and the player with a bye or None
+    """
+    remaining = list(ranking)
+    bye = None
+    if len(remaining) % 2 == 1:
+        bye = next((player for player in reversed(remaining) if player not in byes), remaining[-1])
+        remaining.remove(bye)
+    pairs = []
+    while remaining:
+        player = remaining.pop(0)
+        opponent = next((other for other in remaining if frozenset((player, other)) not in played), remaining[0])
+        remaining.remove(opponent)
+        pairs.append((player, opponent))
+    return pairs, bye
+
+
+def elo_ratings(num_players, games):
+    """Fits Elo ratings to game results by maximum likelihood.
+
+    Every player is also given a virtual draw against an opponent rated 0, which keeps the ratings of players who won
+    or lost every game finite, and anchors the ratings around 0.
+
+    :param num_players: Number of players
+    :param games: List of (white, black, white score) tuples, where white and black are player indexes and the score
+    is 1 for a win, 0.5 for a draw and 0 for a loss
+    :returns list: (rating, confidence interval) of each player, where the 95% confidence interval is rating +- the
+    second element
+    """
+    ratings = [0.0] * num_players
+    for _ in range(100):
+        gradient, hessian = _likelihood_derivatives(ratings, games)
+        # Newton's method: the log-likelihood is concave, so this converges in a few steps
+        step = [-sum(row[j] * gradient[j] for j in range(num_players)) for row in _invert(hessian)]
+        ratings = [rating + delta for rating, delta in zip(ratings, step)]
+        if max([abs(delta) for delta in step], default=0) < 1e-6:
+            break
+    covariance = _invert(_likelihood_derivatives(ratings, games)[1])
+    return [(rating, _CONFIDENCE_Z * math.sqrt(max(-covariance[i][i], 0))) for i, rating in enumerate(ratings)]
+
+
+def _likelihood_derivatives(ratings, games):
+    """Computes the gradient and Hessian of the log-likelihood of the games for the given ratings."""
+    num_players = len(ratings)
+    gradient = [0.0] * num_players
+    hessian = [[0.0] * num_players for _ in range(num_players)]
+
+    def add(i, score, opponent_rating):
+        expected = 1 / (1 + math.exp(_ELO_SCALE * (opponent_rating - ratings[i])))
+        gradient[i] += _ELO_SCALE * (score - expected)
+        variance = _ELO_SCALE * _ELO_SCALE * expected * (1 - expected)
+        hessian[i][i] -= variance
+        return variance
+
+    for i in range(num_players):
+        add(i, 0.5, 0.0)  # Virtual draw against an opponent rated 0
+    for white, black, score in games:
+        variance = add(white, score, ratings[black])
+        add(black, 1 - score, ratings[white])
+        hessian[white][black] += variance
+        hessian[black][white] += variance
+    return gradient, hessian
+
+
+def _invert(matrix):
+    """Inverts a square matrix, given as a list of rows, by Gauss-Jordan elimination with partial pivoting."""
+    size = len(matrix)
+    rows = [list(row) + [1.0 if i == j else 0.0 for j in range(size)] for i, row in enumerate(matrix)]
+    for column in range(size):
+        pivot = max(range(column, size), key=lambda i: abs(rows[i][column]))
+        rows[column], rows[pivot] = rows[pivot], rows[column]
+        scale = rows[column][column]
+        rows[column] = [value / scale for value in rows[column]]
+        for i in range(size):
+            if i != column and rows[i][column] != 0:
+                factor = rows[i][column]
+                rows[i] = [value - factor * pivot_value for value, pivot_value in zip(rows[i], rows[column])]
+    return [row[size:] for row in rows]
+
+
+def _play_game_task(args):
+    """Plays a game of a tournament in a worker process.
+
+    :param args: Round, game index within the round, white label, black label and the arguments of play_game
+    :returns tuple: Round, game index, white label, black label and GameResult
+    """
+    round_num, game, white_label, black_label = args[:4]
+    return round_num, game, white_label, black_label, play_pinned_game(*args[4:])
+
+
+class Tournament:
+    """A round-robin or Swiss tournament between a roster of player classes."""
+    def __init__(self, players, board_size=8, time_limit=1, pairing='round_robin', rounds=None, games_per_pairing=2,
+                 workers=None, state_file=None, isolation=None, cpus=None):
+        """Inits a Tournament with the specified parameters.
+
+        :param players: List of player classes, at least 2. Classes must be defined at module level so the workers can
+        import them.
+        :param board_size: Size of the square board to be used. Must be even and >= 4.
+        :param time_limit: Time in seconds each player has to move
+        :param pairing: 'round_robin' or 'swiss'
+        :param rounds: Number of rounds. Defaults to 1 for a round-robin and to the number of rounds needed to find a
+        single winner, log2 of the number of players rounded up, for a Swiss tournament.
+        :param games_per_pairing: Number of games each pairing plays in a round, with the colours alternated
+        :param workers: Number of worker processes, defaults to the number of CPUs
+        :param state_file: File the results are appended to and resumed from, or None to keep them in memory only
+        :param isolation: Dictionary of IsolatedPlayer keyword arguments to run each player in its own subprocess, or
+        None to run the players in the worker processes. It may change when a tournament is resumed.
+        :param cpus: CPU indexes to play the games on, split between the workers, defaults to the CPUs this process may
+        run on
+        :raises ValueError: if there are fewer than 2 players, a player is repeated or pairing is not one of PAIRINGS
+        """
+        if len(players) < 2:
+            raise ValueError('A tournament needs at least 2 players')
+        if pairing not in PAIRINGS:
+            raise ValueError('pairing must be one of {}.'.format(', '.join(PAIRINGS)))
+        self.players = list(players)
+        self.labels = [player_label(player) for player in self.players]
+        if len(set(self.labels)) != len(self.labels):
+            raise ValueError('Each player may only be entered once')
+        self._board_size = board_size
+        self._time_limit = time_limit
+        self._pairing = pairing
+        self.rounds = rounds or (1 if pairing == 'round_robin' else math.ceil(math.log2(len(players))))
+        self._games_per_pairing = games_per_pairing
+        self._workers = workers or os.cpu_count() or 1
+        self._state_file = state_file
+        self._isolation = isolation
+        self._cpus = cpus
+        self.results = {}  # Results of the games played, (round, game) -> (white index, black index, GameResult)
+        self.byes = {}  # Player given a bye in each round of a Swiss tournament
+        if state_file is not None:
+            self._load_state()
+
+    def _settings(self):
+        """Gets the settings which must match for a tournament to be resumed from a state file."""
+        return {'type': 'settings', 'players': self.labels, 'board_size': self._board_size,
+                'time_limit': self._time_limit, 'pairing': self._pairing, 'rounds': self.rounds,
+                'games_per_pairing': self._games_per_pairing}
+
+    def _load_state(self):
+        """Loads the results of the games already played from the state file, or creates it.
+
+        :raises ValueError: if the state file is for a tournament with different settings
+        """
+        if not os.path.exists(self._state_file) or os.path.getsize(self._state_file) == 0:
+            with open(self._state_file, 'w') as state:
+                state.write(json.dumps(self._settings()) + '\n')
+            return
+        with open(self._state_file) as state:
+            lines = state.read().splitlines()
+        if json.loads(lines[0]) != self._settings():
+            raise ValueError('State file {} is for a different tournament'.format(self._state_file))
+        for line in lines[1:]:
+            try:
+                record = json.loads(line)
+            except ValueError:
+                continue  # The last line may be incomplete if the tournament was interrupted while writing it
+            result = GameResult(**{field: record[field] for field in GameResult._fields})
+            self.results[(record['round'], record['game'])] = (self.labels.index(record['white_player']),
+                                                              self.labels.index(record['black_player']), result)
+
+    def _save_result(self, round_num, game, white, black, result):
+        """Appends the result of a game to the state file."""
+        if self._state_file is None:
+            return
+        record = dict(result._asdict(), type='game', round=round_num, white_player=self.labels[white],
+                      black_player=self.labels[black])
+        with open(self._state_file, 'a') as state:
+            state.write(json.dumps(record) + '\n')
+
+    def _schedule(self, round_num):
+        """Pairs the players for a round.
+
+        :returns list: (white, black) player indexes of each game of the round, in order
+        """
+        if self._pairing == 'round_robin':
+            pairs = round_robin_pairings(len(self.players))
+        else:
+            ranking = [index for index, _ in self._ranking(round_num)]
+            played = set([frozenset((white, black)) for (game_round, _), (white, black, _) in self.results.items()
+                          if game_round < round_num])
+            pairs, self.byes[round_num] = swiss_pairings(ranking, played, set(self.byes.values()))
+        games = []
+        for player, opponent in pairs:
+            for game in range(self._games_per_pairing):
+                games.append((player, opponent) if game % 2 == 0 else (opponent, player))
+        return games
+
+    def _ranking(self, before_round=None):
+        """Ranks the players by score, then by Elo rating, then in roster order.
+
+        :param before_round: Only count the rounds before this one, or None to count every round
+        :returns list: (player index, score) of each player, best first
+        """
+        scores = self.scores(before_round)
+        ratings = elo_ratings(len(self.players), self._games(before_round))
+        return sorted([(i, scores[i]) for i in range(len(self.players))],
+                      key=lambda item: (-item[1], -ratings[item[0]][0], item[0]))
+
+    def _games(self, before_round=None):
+        """Gets the (white, black, white score) of each game played, in the rounds before before_round if given."""
+        games = []
+        for (round_num, _), (white, black, result) in sorted(self.results.items()):
+            if before_round is None or round_num < before_round:
+                games.append((white, black, 1 if result.winner == 'w' else 0.5 if result.winner == 'd' else 0))
+        return games
+
+    def scores(self, before_round=None):
+        """Gets the score of each player: 1 per win, 0.5 per draw and, in a Swiss tournament, 1 per game of a bye.
+
+        :param before_round: Only count the rounds before this one, or None to count every round
+        :returns list: Score of each player
+        """
+        scores = [0.0] * len(self.players)
+        for white, black, score in self._games(before_round):
+            scores[white] += score
+            scores[black] += 1 - score
+        for round_num, player in self.byes.items():
+            if player is not None and (before_round is None or round_num < before_round):
+                scores[player] += self._games_per_pairing
+        return scores
+
+    def run(self, on_result=None):
+        """Plays the games of the tournament not played yet.
+
+        :param on_result: Function called with (round, white label, black label, GameResult) as each game finishes
+        :returns list: Standings, see standings
+        """
+        with create_pool(self._workers, self._cpus, maxtasksperchild=1) as pool:
+            round_num = 0
+            # A round-robin has no dependency between rounds, so every round is scheduled at once
+            while round_num < self.rounds:
+                last_round = self.rounds if self._pairing == 'round_robin' else round_num + 1
+                tasks = []
+                for scheduled_round in range(round_num, last_round):
+                    for game, (white, black) in enumerate(self._schedule(scheduled_round)):
+                        if (scheduled_round, game) not in self.results:
+                            tasks.append((scheduled_round, game, self.labels[white], self.labels[black],
+                                          self.players[white], self.players[black], self._board_size,
+                                          self._time_limit, game, self._isolation))
+                # Games are played in a fresh worker process each, so threads left running by a player which could
+                # not be stopped do not slow down the next game
+                for scheduled_round, game, white_label, black_label, result in pool.imap_unordered(_play_game_task,
+                                                                                                  tasks):
+                    white, black = self.labels.index(white_label), self.labels.index(black_label)
+                    self.results[(scheduled_round, game)] = (white, black, result)
+                    self._save_result(scheduled_round, game, white, black, result)
+                    if on_result is not None:
+                        on_result(scheduled_round, white_label, black_label, result)
+                round_num = last_round
+        return self.standings()
+
+    def standings(self):
+        """Gets the standings of the tournament.
+
+        :returns list: Dictionary for each player, best first, with its label, name, games, wins, losses, draws,
+        score, Elo rating and the 95% confidence interval of the rating (the rating is within +- elo_interval)
+        """
+        ratings = elo_ratings(len(self.players), self._games())
+        records = [{'games': 0, 'wins': 0, 'losses': 0, 'draws': 0} for _ in self.players]
+        names = {}
+        for white, black, result in self.results.values():
+            names[white], names[black] = result.white, result.black
+            for player, color in ((white, 'w'), (black, 'b')):
+                records[player]['games'] += 1
+                if result.winner == 'd':
+                    records[player]['draws'] += 1
+                else:
+                    records[player]['wins' if result.winner == color else 'losses'] += 1
+        return [dict(records[i], label=self.labels[i], name=names.get(i, self.players[i].__name__), score=score,
+                     elo=ratings[i][0], elo_interval=ratings[i][1]) for i, score in self._ranking()]
+
+
+def print_standings(standings):
+    """Prints a table of tournament standings to the console."""
+    print('{:>4} {:<30} {:>6} {:>6} {:>6} {:>6} {:>7} {:>7} {:>6}'.format('Rank', 'Player', 'Games', 'Wins', 'Losses',
+                                                                         'Draws', 'Score', 'Elo', '+-'))
+    for rank, player in enumerate(standings):
+        print('{:>4} {:<30} {:>6} {:>6} {:>6} {:>6} {:>7.1f} {:>7} {:>6}'.format(
+            rank + 1, player['name'][:30], player['games'], player['wins'], player['losses'], player['draws'],
+            player['score'], round(player['elo']), round(player['elo_interval'])))
+
+
+def main():
+    parser = argparse.ArgumentParser(description='League tournament between AI players')
+    parser.add_argument('players', nargs='+', help='Classes of the players, eg, players.simple_ai.SimpleAI')
+    parser.add_argument('--pairing', choices=PAIRINGS, default='round_robin', help='Pairing (default: round_robin)')
+    parser.add_argument('--rounds', type=int, help='Number of rounds (default: 1 for a round-robin, log2 of the '
+                                                    'number of players for Swiss)')
+    parser.add_argument('--games-per-pairing', type=int, default=2,
+                        help='Games each pairing plays per round, with the colours alternated (default: 2)')
+    parser.add_argument('--size', type=int, default=8, help='Board size (default: 8)')
+    parser.add_argument('--time', type=float, default=1, help='Time limit per move in seconds (default: 1)')
+    parser.add_argument('--workers', type=int, help='Number of worker processes (default: number of CPUs)')
+    parser.add_argument('--state', help='File to save results to and resume the tournament from')
+    add_isolation_arguments(parser)
+    args = parser.parse_args()
+
+    tournament = Tournament([load_player(player) for player in args.players], args.size, args.time, args.pairing,
+                            args.rounds, args.games_per_pairing, args.workers, args.state,
+                            isolation_settings(args), args.cpus)
+    if tournament.results:
+        print('[.] Resuming with {} games already played'.format(len(tournament.results)))
+
+    def report(round_num, white, black, result):
+        print('[+] Round {}: {} (w) vs {} (b), {} in {} plies by {}'.format(
+            round_num + 1, result.white, result.black, 'draw' if result.winner == 'd' else result.winner + ' wins',
+            result.plies, result.termination))
+
+    print_standings(tournament.run(report))
+
+
+if __name__ == '__main__':
+    main()
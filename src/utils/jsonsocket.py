@@ -136,4 +136,25 @@ def json_recv(socket):
         deserialized = json.loads(view.tobytes())
     except (TypeError, ValueError):
         raise Exception('Data received was not in JSON format')
-    return deserialized
\ No newline at end of file
+    return deserialized
+
+# asyncio helper functions, using the same framing as json_send and json_recv #
+async def json_send_async(writer, data):
+    try:
+        serialized = json.dumps(data)
+    except (TypeError, ValueError):
+        raise Exception('You can only send JSON-serializable data')
+    writer.write(('%d\n' % len(serialized)).encode() + serialized.encode())
+    await writer.drain()
+
+
+async def json_recv_async(reader):
+    # raises asyncio.IncompleteReadError if the connection is closed before a whole message is received
+    length_str = await reader.readuntil(b'\n')
+    total = int(length_str)
+    data = await reader.readexactly(total)
+    try:
+        deserialized = json.loads(data)
+    except (TypeError, ValueError):
+        raise ValueError('Data received was not in JSON format')
+    return deserialized
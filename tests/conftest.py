@@ -0,0 +1,5 @@
+import os
+import sys
+
+# The modules are imported the way the scripts in src import each other, eg, 'import board'
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'src'))
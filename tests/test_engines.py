@@ -0,0 +1,67 @@
+"""Comparison of BitboardCheckerBoard and BatchCheckerBoard against CheckerBoard over random games."""
+import random
+
+import pytest
+
+from board import CheckerBoard
+from bitboard import BitboardCheckerBoard
+
+try:
+    from batch_board import BatchCheckerBoard, np
+except ImportError:
+    np = None
+
+_SIZES = (4, 6, 8, 10, 12)
+
+
+def _random_games(size, games, seed):
+    """Yields each position of random games from the start, as a CheckerBoard."""
+    rng = random.Random(seed)
+    for _ in range(games):
+        board = CheckerBoard(size)
+        while True:
+            yield board
+            if board.get_winner() is not None:
+                break
+            board.execute_move(rng.choice(board.legal_moves()))
+
+
+@pytest.mark.parametrize('size', _SIZES)
+def test_bitboard_matches_checkerboard(size):
+    rng = random.Random(size)
+    for _ in range(10):
+        board = CheckerBoard(size)
+        other = BitboardCheckerBoard(size)
+        tokens = []
+        while board.get_winner() is None:
+            assert sorted(other.legal_moves()) == sorted(board.legal_moves())
+            move = rng.choice(board.legal_moves())
+            board.execute_move(move)
+            tokens.append(other.make_move(move))
+            assert other.get_squares() == board.get_squares()
+            assert other.current_player == board.current_player
+        assert other.get_winner() == board.get_winner()
+        # Unmaking every move returns to the start
+        for token in reversed(tokens):
+            other.unmake_move(token)
+        assert other.get_squares() == CheckerBoard(size).get_squares()
+
+
+@pytest.mark.skipif(np is None, reason='BatchCheckerBoard requires numpy')
+@pytest.mark.parametrize('size', _SIZES)
+def test_batch_matches_checkerboard(size):
+    boards = [board.clone() for board in _random_games(size, 5, size)]
+    batch = BatchCheckerBoard.from_boards(boards)
+    assert batch.legal_moves() == [board.legal_moves() for board in boards]
+    assert batch.get_winners() == [board.get_winner() for board in boards]
+    assert batch.get_current_players() == [board.current_player for board in boards]
+
+    # One random move in every game which is not over
+    rng = random.Random(size)
+    moves = [rng.choice(board.legal_moves()) if board.get_winner() is None else None for board in boards]
+    batch.make_moves(moves)
+    for board, move in zip(boards, moves):
+        if move is not None:
+            board.execute_move(move)
+    assert batch.get_squares().tobytes() == b''.join(board.get_squares() for board in boards)
+    assert batch.get_winners() == [board.get_winner() for board in boards]
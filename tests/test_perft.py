@@ -0,0 +1,38 @@
+"""Reference perft counts and move-by-move comparison of every engine against CheckerBoard."""
+import pytest
+
+from board import CheckerBoard
+from perft import CORPUS, ENGINES, START_COUNTS, parse_position, verify
+
+# Deepest depths counted and verified, kept small so the suite runs in seconds
+_COUNT_DEPTH = 4
+_VERIFY_DEPTH = 3
+
+
+def _load(engine, board):
+    return board if engine == 'batch' else ENGINES[engine][1](list(board), board.current_player)
+
+
+@pytest.mark.parametrize('engine', sorted(ENGINES))
+@pytest.mark.parametrize('size', sorted(START_COUNTS))
+def test_start_counts(engine, size):
+    counts = START_COUNTS[size]
+    depth = min(_COUNT_DEPTH, len(counts))
+    assert ENGINES[engine][0](_load(engine, CheckerBoard(size)), depth) == counts[depth - 1]
+
+
+@pytest.mark.parametrize('engine', sorted(ENGINES))
+@pytest.mark.parametrize('position, counts', CORPUS)
+def test_corpus_counts(engine, position, counts):
+    board = CheckerBoard.from_rows(*parse_position(position))
+    depth = min(_COUNT_DEPTH, len(counts))
+    assert ENGINES[engine][0](_load(engine, board), depth) == counts[depth - 1]
+
+
+@pytest.mark.parametrize('engine', sorted(ENGINES))
+@pytest.mark.parametrize('position', [position for position, _ in CORPUS] + [None])
+def test_verify(engine, position):
+    board = CheckerBoard(8) if position is None else CheckerBoard.from_rows(*parse_position(position))
+    squares = board.get_squares()
+    assert verify(board, _VERIFY_DEPTH, engine) == []
+    assert board.get_squares() == squares
@@ -0,0 +1,86 @@
+"""Comparison of AlphaBetaSearch against a plain fixed-depth negamax."""
+import random
+import time
+
+import pytest
+
+from board import CheckerBoard
+from players.ordering import MoveOrdering
+from players.search import WIN_SCORE, AlphaBetaSearch, material
+from players.transposition import TranspositionTable
+
+_DEPTH = 4
+
+
+def negamax(board, depth, ply=0):
+    """Scores a position by searching every move to depth, with the same leaf and end game scores as the search."""
+    winner = board.get_winner()
+    if winner is not None:
+        if winner == 'd':
+            return 0
+        return WIN_SCORE - ply if winner == board.current_player else -WIN_SCORE + ply
+    moves = board.legal_moves()
+    if len(moves) == 0:
+        return -WIN_SCORE + ply
+    if depth == 0:
+        return material(board, board.current_player)
+    best = -WIN_SCORE - 1
+    for move in moves:
+        token = board.make_move(move)
+        best = max(best, -negamax(board, depth - 1, ply + 1))
+        board.unmake_move(token)
+    return best
+
+
+def _positions(size, count, seed):
+    """Gets positions reached by random moves from the start, with the game not over."""
+    rng = random.Random(seed)
+    positions = []
+    while len(positions) < count:
+        board = CheckerBoard(size)
+        for _ in range(rng.randint(0, 40)):
+            if board.get_winner() is not None:
+                break
+            board.execute_move(rng.choice(board.legal_moves()))
+        if board.get_winner() is None and len(board.legal_moves()) > 1:
+            positions.append(board)
+    return positions
+
+
+def _search(board, **kwargs):
+    """Searches board to _DEPTH without quiescence, returning the depth and score of the last completed depth."""
+    depths = []
+    search = AlphaBetaSearch(max_depth=_DEPTH, quiescence_nodes=0, **kwargs)
+    move = search.search(board, time.monotonic() + 600, [], on_depth=lambda depth, score, _: depths.append(
+        (depth, score)))
+    return move, depths[-1]
+
+
+@pytest.mark.parametrize('size', (6, 8))
+@pytest.mark.parametrize('options', ('plain', 'ordering', 'table'))
+def test_alpha_beta_matches_negamax(size, options):
+    for board in _positions(size, 10, size):
+        squares = board.get_squares()
+        kwargs = {}
+        if options in ('ordering', 'table'):
+            kwargs['ordering'] = MoveOrdering()
+        if options == 'table':
+            kwargs['table'] = TranspositionTable(1)
+        move, (depth, score) = _search(board, **kwargs)
+        assert board.get_squares() == squares
+        assert score == negamax(board, depth)
+        # The move found scores the same as the best move
+        token = board.make_move(move)
+        assert -negamax(board, depth - 1, 1) == score
+        board.unmake_move(token)
+
+
+def test_table_key_includes_move_counter():
+    # The same position close to the 40 move rule must not reuse scores stored with another counter
+    table = TranspositionTable(1)
+    for board in _positions(8, 5, 40):
+        rows = [board[row] for row in range(8)]
+        for count in (0, 36, 38, 39):
+            position = CheckerBoard.from_rows(rows, board.current_player, count)
+            _, (depth, score) = _search(position, table=table)
+            assert score == negamax(position, depth)